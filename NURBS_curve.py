@@ -22,12 +22,22 @@ from OCC.Core.BRepGProp import (brepgprop_LinearProperties,
 from abc import ABC, abstractmethod
 from OCC.Core.gp import gp_Pnt2d
 from OCC.Core.BRepTools import breptools_Dump, breptools_Write
+from OCC.Core.Geom import Geom_BSplineCurve
+from occ_numpy import array1_of_pnt, array1_of_real, curve_knot_vector
+from instrument import count
+import numpy as np
 
 
 class Curve:
-    def __init__(self, face, surf):
+    # Curves are converted once and dropped, so they keep no __dict__ and no copy of their data
+    __slots__ = ('face', 'surf', 'c_id', 'interval')
+
+    def __init__(self, face, surf, c_id):
         self.face = face
         self.surf = surf
+        self.c_id = c_id
+        # [first, last] parameter of the edge on the curve, set by CurveFactory
+        self.interval = None
 
     @abstractmethod
     def extract_curve_data(self):
@@ -37,181 +47,143 @@ class Curve:
 class CurveFactory:
 
     def create_curve_object(self, curve_adapter, face, surf, c_id):
-
+        # curve_adapter is a BRepAdaptor_Curve2d for a pcurve on face, or a BRepAdaptor_Curve
+        # (face and surf None) for the 3D curve of an edge. Unsupported types return None.
+        curve = self.create_curve(curve_adapter, face, surf, c_id)
+        if curve is not None:
+            curve.interval = [curve_adapter.FirstParameter(), curve_adapter.LastParameter()]
+        return curve
+
+    def create_curve(self, curve_adapter, face, surf, c_id):
         curve_type = curve_adapter.GetType()
+        if surf is not None and curve_type in (GeomAbs_BSplineCurve, GeomAbs_Line, GeomAbs_Circle, GeomAbs_Ellipse):
+            surf.trimmed = True
 
         if curve_type == GeomAbs_BSplineCurve:
-            surf.trimmed = True
             bspline_curve = curve_adapter.BSpline()
             return BSplineCurve(bspline_curve, face, surf, c_id)
 
 
         elif curve_type == GeomAbs_Line:
-            surf.trimmed = True
             line_curve = curve_adapter.Line()
             return Line(line_curve, face, surf, c_id)
 
 
         elif curve_type == GeomAbs_Circle:
-            surf.trimmed = True
             circle_curve = curve_adapter.Circle()
             return Circle(circle_curve,face,surf,c_id)
 
         elif curve_type == GeomAbs_Ellipse:
-            surf.trimmed = True
             circle_curve = curve_adapter.Ellipse()
             return Ellipse(circle_curve,face,surf,c_id)
 
 
 class BSplineCurve(Curve):
+    __slots__ = ('bspline_curve',)
+    curve_type = "spline"
+
     def __init__(self, bspline_curve, face, surf, c_id):
-        super(BSplineCurve, self).__init__(face, surf)
+        super(BSplineCurve, self).__init__(face, surf, c_id)
         self.bspline_curve = bspline_curve
-        self.curve_info = {}
-        self.curve_type = "spline"
-        self.face = face
-        self.order = 0
-        self.n_points = 0
-        self.ctrl_points = []
-        self.weights = []
-        self.knotvector = []
-        self.c_id = c_id
-
 
     def extract_curve_data(self, f_id):
-
-        self.degree=self.bspline_curve.Degree()
-        self.rational = self.bspline_curve.IsRational()
-        self.continuity=self.bspline_curve.Continuity()
-        self.order = self.bspline_curve.Degree() + 1
-        self.n_points = self.bspline_curve.NbPoles()
-        self.periodic = self.bspline_curve.IsPeriodic()
-
-        if self.periodic:
-            self.bspline_curve.SetNotPeriodic()
-
-        p = TColgp_Array1OfPnt2d(1, self.bspline_curve.NbPoles())
-        self.bspline_curve.Poles(p)
-
-        for pi in range(p.Length()):
-            self.ctrl_points.append(list(p.Value(pi + 1).Coord()))
-
-        k = TColStd_Array1OfReal(1, self.bspline_curve.NbPoles() + self.bspline_curve.Degree() + 1)
-        self.bspline_curve.KnotSequence(k)
-
-        for ki in range(k.Length()):
-            self.knotvector.append(k.Value(ki + 1))
-
-        w = TColStd_Array1OfReal(1, self.bspline_curve.NbPoles())
-        self.bspline_curve.Weights(w)
-        for wi in range(w.Length()):
-            self.weights.append(w.Value(wi + 1))
-
-        self.curve_info['type'] = self.curve_type
-        self.curve_info['curve id'] = self.c_id
-        self.curve_info['rational']=self.rational
-        self.curve_info['degree']=self.degree
-        self.curve_info['knotvector']=self.knotvector
-        self.curve_info['control_points']={}
-        self.curve_info['control_points']['points']=self.ctrl_points
-        self.curve_info['control_points']['weights']=self.weights
-        self.curve_info['reversed']=0
-
-        return self.curve_info
+        bspline_curve = self.bspline_curve
+        if bspline_curve.IsPeriodic():
+            bspline_curve.SetNotPeriodic()
+
+        n_poles = bspline_curve.NbPoles()
+        count('curve_poles', n_poles)
+        if isinstance(bspline_curve, Geom_BSplineCurve):
+            p = TColgp_Array1OfPnt(1, n_poles)
+            bspline_curve.Poles(p)
+            ctrl_points = array1_of_pnt(p, dim=3)
+        else:
+            p = TColgp_Array1OfPnt2d(1, n_poles)
+            bspline_curve.Poles(p)
+            ctrl_points = array1_of_pnt(p, dim=2)
+
+        rational = bspline_curve.IsRational()
+        if rational:
+            w = TColStd_Array1OfReal(1, n_poles)
+            bspline_curve.Weights(w)
+            weights = array1_of_real(w)
+        else:
+            weights = np.ones(n_poles)
+
+        curve_info = {}
+        curve_info['type'] = self.curve_type
+        curve_info['curve id'] = self.c_id
+        curve_info['rational'] = rational
+        curve_info['interval'] = self.interval
+        curve_info['degree'] = bspline_curve.Degree()
+        curve_info['knotvector'] = curve_knot_vector(bspline_curve)
+        curve_info['control_points'] = {}
+        curve_info['control_points']['points'] = ctrl_points
+        curve_info['control_points']['weights'] = weights
+        curve_info['reversed'] = 0
+        self.bspline_curve = None
+        return curve_info
 
 
 class Line(Curve):
+    __slots__ = ('line_curve',)
+
     def __init__(self, line_curve, face, surf, c_id):
-        super(Line, self).__init__(face, surf)
+        super(Line, self).__init__(face, surf, c_id)
         self.line_curve = line_curve
-        self.curve_info = {}
-        self.c_id = c_id
-        self.face = face
-        self.surf = surf
-        self.location=[]
-        self.direction=[]
 
     def extract_curve_data(self, f_id):
-
-        self.location=list(self.line_curve.Location().Coord())
-        self.direction = list(self.line_curve.Direction().Coord())
-
-        self.curve_info['type'] = 'line'
-        self.curve_info['curve id'] = self.c_id
-        self.curve_info['data'] = {}
-        self.curve_info['data']['location'] = self.location
-        self.curve_info['data']['direction'] = self.direction
-
-
-        return self.curve_info
+        curve_info = {}
+        curve_info['type'] = 'line'
+        curve_info['curve id'] = self.c_id
+        curve_info['interval'] = self.interval
+        curve_info['data'] = {}
+        curve_info['data']['location'] = list(self.line_curve.Location().Coord())
+        curve_info['data']['direction'] = list(self.line_curve.Direction().Coord())
+        self.line_curve = None
+        return curve_info
 
 
 class Circle(Curve):
+    __slots__ = ('circle_curve',)
+
     def __init__(self, circle_curve, face, surf, c_id):
-        super(Circle, self).__init__(face, surf)
+        super(Circle, self).__init__(face, surf, c_id)
         self.circle_curve = circle_curve
-        self.curve_info = {}
-        self.c_id = c_id
-        self.face = face
-        self.surf = surf
-        self.location = []
-        self.radius=0
-        self.x_axis=[]
-        self.y_axis=[]
 
     def extract_curve_data(self, f_id):
-        self.location = list(self.circle_curve.Location().Coord())
-        self.radius=self.circle_curve.Radius()
-        self.x_axis=list(self.circle_curve.XAxis().Direction().Coord())
-        self.y_axis = list(self.circle_curve.YAxis().Direction().Coord())
-
-        self.curve_info['type'] = 'circle'
-        self.curve_info['curve id'] = self.c_id
-        self.curve_info['data'] = {}
-        self.curve_info['data']['location'] = self.location
-        self.curve_info['data']['radius'] = self.radius
-        self.curve_info['data']['x_axis']= self.x_axis
-        self.curve_info['data']['y_axis']=self.y_axis
-
-        return self.curve_info
+        curve_info = {}
+        curve_info['type'] = 'circle'
+        curve_info['curve id'] = self.c_id
+        curve_info['interval'] = self.interval
+        curve_info['data'] = {}
+        curve_info['data']['location'] = list(self.circle_curve.Location().Coord())
+        curve_info['data']['radius'] = self.circle_curve.Radius()
+        curve_info['data']['x_axis'] = list(self.circle_curve.XAxis().Direction().Coord())
+        curve_info['data']['y_axis'] = list(self.circle_curve.YAxis().Direction().Coord())
+        self.circle_curve = None
+        return curve_info
 
 
 class Ellipse(Curve):
+    __slots__ = ('ellipse_curve',)
+
     def __init__(self, ellipse_curve, face, surf, c_id):
-        super(Ellipse, self).__init__(face, surf)
+        super(Ellipse, self).__init__(face, surf, c_id)
         self.ellipse_curve = ellipse_curve
-        self.curve_info = {}
-        self.c_id = c_id
-        self.face = face
-        self.surf = surf
-        self.focus1=[]
-        self.focus2 =[]
-        self.x_axis=[]
-        self.y_axis=[]
 
     def extract_curve_data(self, f_id):
-        self.location = list(self.ellipse_curve.Location().Coord())
-        self.focus1=list(self.ellipse_curve.Focus1().Coord())
-        self.focus2=list(self.ellipse_curve.Focus2().Coord())
-        self.x_axis=list(self.ellipse_curve.XAxis().Direction().Coord())
-        self.y_axis = list(self.ellipse_curve.YAxis().Direction().Coord())
-        self.major_radius=self.ellipse_curve.MajorRadius()
-        self.minor_radius=self.ellipse_curve.MinorRadius()
-
-        self.curve_info['type'] = 'ellipse'
-        self.curve_info['curve id'] = self.c_id
-        self.curve_info['data'] = {}
-        self.curve_info['data']['location'] = self.location
-        self.curve_info['data']['focus1'] = self.focus1
-        self.curve_info['data']['focus2'] = self.focus2
-        self.curve_info['data']['x_axis']= self.x_axis
-        self.curve_info['data']['y_axis']=self.y_axis
-        self.curve_info['data']['major_radius'] = self.major_radius
-        self.curve_info['data']['minor_radius'] = self.minor_radius
-
-        return self.curve_info
-
-
-
-
-
+        curve_info = {}
+        curve_info['type'] = 'ellipse'
+        curve_info['curve id'] = self.c_id
+        curve_info['interval'] = self.interval
+        curve_info['data'] = {}
+        curve_info['data']['location'] = list(self.ellipse_curve.Location().Coord())
+        curve_info['data']['focus1'] = list(self.ellipse_curve.Focus1().Coord())
+        curve_info['data']['focus2'] = list(self.ellipse_curve.Focus2().Coord())
+        curve_info['data']['x_axis'] = list(self.ellipse_curve.XAxis().Direction().Coord())
+        curve_info['data']['y_axis'] = list(self.ellipse_curve.YAxis().Direction().Coord())
+        curve_info['data']['major_radius'] = self.ellipse_curve.MajorRadius()
+        curve_info['data']['minor_radius'] = self.ellipse_curve.MinorRadius()
+        self.ellipse_curve = None
+        return curve_info
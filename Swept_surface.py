@@ -0,0 +1,60 @@
+from OCC.Core.GeomAbs import (GeomAbs_SurfaceOfRevolution, GeomAbs_SurfaceOfExtrusion,
+                              GeomAbs_OffsetSurface)
+
+from NURBS_curve import CurveFactory
+from surface import Surface, SURFACE_HANDLERS, register_surface
+
+
+def extract_basis_curve(curve_adapter):
+    """The 3D generatrix of a swept surface, in the same format as an edge curve."""
+    c = CurveFactory().create_curve_object(curve_adapter, None, None, 1)
+    if c is None:
+        return {'type': 'unsupported'}
+    return c.extract_curve_data(None)
+
+
+@register_surface(GeomAbs_SurfaceOfRevolution)
+class SurfaceOfRevolution(Surface):
+    __slots__ = ()
+
+    def extract_geometry(self):
+        axis = self.surf.AxeOfRevolution()
+
+        face = {}
+        face['kind'] = "Surface of Revolution"
+        face["location"] = list(axis.Location().Coord())
+        face["z_axis"] = list(axis.Direction().Coord())
+        face["basis_curve"] = extract_basis_curve(self.surf.BasisCurve().Curve())
+        return face
+
+
+@register_surface(GeomAbs_SurfaceOfExtrusion)
+class SurfaceOfExtrusion(Surface):
+    __slots__ = ()
+
+    def extract_geometry(self):
+        face = {}
+        face['kind'] = "Surface of Extrusion"
+        face["direction"] = list(self.surf.Direction().Coord())
+        face["basis_curve"] = extract_basis_curve(self.surf.BasisCurve().Curve())
+        return face
+
+
+@register_surface(GeomAbs_OffsetSurface)
+class OffsetSurface(Surface):
+    __slots__ = ()
+
+    def extract_geometry(self):
+        basis = self.surf.BasisSurface().Surface()
+        handler = SURFACE_HANDLERS.get(basis.GetType())
+
+        face = {}
+        face['kind'] = "Offset Surface"
+        face["offset"] = self.surf.OffsetValue()
+        # The basis surface is described by its own handler, without header or trims:
+        # the trims belong to the offset face
+        if handler is None:
+            face["basis_surface"] = {'kind': 'unsupported'}
+        else:
+            face["basis_surface"] = handler(self.face, basis, self.f_id).extract_geometry()
+        return face
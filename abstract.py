@@ -27,8 +27,35 @@ from OCC.Core.BRepGProp import (brepgprop_LinearProperties,
 from OCC.Core.gp import gp_Pnt2d
 
 TOLERANCE = 1e-6
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from abc import ABC,abstractmethod
 from surface import Surface, SurfaceFactory
+from instrument import stage, clear_stage_listeners, collect_metrics, merge_metrics, count
+from mesh import triangulate_shape, triangulate_lods, triangulate_parts, resolve_mesh_params, mesh_threads, \
+    set_mesh_threads
+from OCC.Core.BRepTools import breptools_Clean
+from brep_io import write_brep, read_brep
+from edges import EdgeRegistry
+from properties import bounding_box, oriented_bounding_box, face_area, volume_properties, FaceTable
+from versions import SECTION_VERSIONS, stale_sections
+from topology import extract_topology
+
+
+class lazy_property:
+    """Property computed on first access and then stored on the instance, so it is computed once."""
+
+    def __init__(self, function):
+        self.function = function
+        self.__doc__ = function.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = self.function(instance)
+        instance.__dict__[self.function.__name__] = value
+        return value
 
 
 class Topology(ABC):
@@ -65,6 +92,51 @@ class Curve():
     #     super(Curve, self).__init__()
     #     self.arg = arg
     pass
+
+
+class Face():
+    """A supported face of a solid, extracted piece by piece on first access.
+
+    face.geometry runs only its surface handler's extract_surface(), face.trims only
+    the trim loops, and face.config assembles both the way Solid.parse_shape writes a
+    face. Every part is memoized, so a query pays only for the parts it reads.
+    """
+
+    def __init__(self, face, f_id, surface):
+        self.face = face
+        self.f_id = f_id
+        self.surface = surface
+
+    def __repr__(self):
+        return "Face(%d, %s)" % (self.f_id, self.surface_type)
+
+    @property
+    def surface_type(self):
+        """Name of the surface handler class (e.g. 'Cylinder'), known without extracting anything."""
+        return type(self.surface).__name__
+
+    @lazy_property
+    def geometry(self):
+        with stage('extract_geometry'):
+            return self.surface.extract_surface()
+
+    @lazy_property
+    def trims(self):
+        return self.surface.extract_trims_curves()
+
+    @lazy_property
+    def bounding_box(self):
+        return bounding_box(self.face)
+
+    @lazy_property
+    def area(self):
+        return face_area(self.face)
+
+    @lazy_property
+    def config(self):
+        shape_config = self.surface.extract_header()
+        shape_config['data'] = self.surface.add_trims(self.geometry, self.trims)
+        return {'shape': shape_config}
         
 
 
@@ -83,91 +155,226 @@ class Solid(Topology):
         self.triangles = {}
         self.config = {}
 
-    def parse_shape(self):
+    @lazy_property
+    def faces(self):
+        """The supported faces as lazy Face objects; nothing is extracted until they are read."""
+        faces = []
+        with stage('traverse_topology'):
+            subshapes = list(TopologyExplorer(self.shape).faces())
+        for f_id, subshape in enumerate(subshapes, 1):
+            surface = SurfaceFactory().create_surface_object(subshape, f_id)
+            if surface is not None:
+                faces.append(Face(subshape, f_id, surface))
+        return faces
+
+    def faces_of_type(self, surface_type):
+        """The faces whose surface handler is surface_type (a class name, e.g. 'Cylinder')."""
+        return [face for face in self.faces if face.surface_type == surface_type]
+
+    @lazy_property
+    def bounding_box(self):
+        return self.get_bounding_box()
+
+    @lazy_property
+    def mesh(self):
+        """Triangulation with the default mesh parameters."""
+        with stage('triangulate_solid'):
+            return self.triangulate_solid()
+
+    @lazy_property
+    def mass_properties(self):
+        with stage('solid_properties'):
+            return volume_properties(self.shape)
+
+    @property
+    def volume(self):
+        return self.mass_properties[0]
+
+    @property
+    def centroid(self):
+        return self.mass_properties[1]
+
+    def parse_shape(self, mesh_params=None, triangles=None, share_edges=False, stream=False, optimal_bbox=False,
+                    oriented_bbox=False, topology=False):
+        """mesh_params is a dict of tessellation parameters (see mesh.DEFAULT_MESH_PARAMS), or a
+        list of them to produce several levels of detail: the first goes to 'triangles' and the
+        others to 'triangles_lod'. triangles is an already computed mesh (or list of levels)
+        to use instead of meshing the solid again.
+
+        With share_edges each edge's 3D curve is converted once into the solid's 'edges'
+        table, and face trims refer to it by 'edge id' (see edges.EdgeRegistry).
+
+        With topology the solid gets its face / edge / vertex adjacency as arrays in 'topology'
+        (see topology.extract_topology) and every edge's 3D curve in 'edges', numbered like
+        the edges of the adjacency arrays.
+
+        With stream, 'data' is a generator that extracts each face as it is consumed (e.g. by
+        writers.write_json), so only one face is held in memory at a time.
+
+        Bounding boxes are float arrays [xmin, ymin, zmin, xmax, ymax, zmax, dx, dy, dz];
+        optimal_bbox makes the solid's tight, and oriented_bbox adds an 'oriented_bounding_box'.
+        The solid's volume and centroid are stored too, and 'face_table' holds the face ids,
+        kinds, areas and bounding boxes of all faces as columns (see properties.FaceTable).
+
+        Parts already computed through the lazy attributes (bounding_box, mesh, volume) are
+        reused rather than computed again. 'versions' stamps the output with the
+        versions.SECTION_VERSIONS it was produced with (see update_config)."""
         assert self.shape_type is "Solid"
         self.config['shape'] = self.shape_type
         self.config['solid id'] = self.s_id
-        self.config['bounding_box']=self.get_bounding_box()
-        verts, triangles = self.triangulate_solid()
-        if verts!=None and triangles!=None:
-            self.triangles['vertices']= verts
-            self.triangles['triangles'] = triangles
-        self.config['triangles'] = self.triangles
+        self.config['versions'] = dict(SECTION_VERSIONS)
+        self.set_bounding_boxes(optimal_bbox, oriented_bbox)
+        self.config['volume'], self.config['centroid'] = self.mass_properties
+        self.set_triangles(triangles if triangles is not None else self.compute_triangles(mesh_params))
        
-        self.config['data'] = []
+        edge_registry = EdgeRegistry() if share_edges or topology else None
+        if topology:
+            with stage('extract_topology'):
+                self.config['topology'] = extract_topology(self.shape, edge_registry)
+        face_table = {}
+        faces = self.iter_faces(edge_registry if share_edges else None, face_table)
+        self.config['data'] = faces if stream else list(faces)
+        # Like 'edges', filled in once 'data' has been consumed
+        self.config['face_table'] = face_table
+        if edge_registry is not None:
+            # When streaming, the table fills up while 'data' is consumed, before 'edges' is written
+            self.config['edges'] = edge_registry.edges
+
+    def set_bounding_boxes(self, optimal_bbox=False, oriented_bbox=False):
+        with stage('get_bounding_box'):
+            self.config['bounding_box'] = self.get_bounding_box(True) if optimal_bbox else self.bounding_box
+            if oriented_bbox:
+                self.config['oriented_bounding_box'] = oriented_bounding_box(self.shape)
+
+    def compute_triangles(self, mesh_params=None):
+        # The default mesh is reused when the parameters resolve to the same ones; otherwise
+        # triangulate_shape replaces whatever triangulation is on the shape
+        if 'mesh' in self.__dict__ and isinstance(mesh_params, (dict, type(None))) and \
+                resolve_mesh_params(self.shape, mesh_params) == self.mesh['params']:
+            return self.mesh
+        if mesh_params is None:
+            return self.mesh
+        with stage('triangulate_solid'):
+            if isinstance(mesh_params, list):
+                return triangulate_lods(self.shape, mesh_params)
+            return self.triangulate_solid(mesh_params)
+
+    def set_triangles(self, triangles):
+        if isinstance(triangles, list):
+            self.triangles = triangles[0]
+            self.config['triangles_lod'] = triangles[1:]
+        else:
+            self.triangles = triangles
+        self.config['triangles'] = self.triangles
+        count('triangles', len(self.triangles['triangles']))
+
+    def update_config(self, config, mesh_params=None, share_edges=False, optimal_bbox=False, oriented_bbox=False,
+                      topology=False):
+        """Bring config, an earlier parse_shape output of this solid (e.g. read back with
+        writers.read_output), up to date by recomputing only the sections that are older
+        than versions.SECTION_VERSIONS, in place. The options are those of parse_shape.
+        Returns the names of the recomputed sections."""
+        stale = stale_sections(config)
+        if not stale:
+            return stale
+        faces = self.faces
+        face_configs = dict((face_config['shape']['face_id'], face_config) for face_config in config['data'])
+        if set(face_configs) != set(face.f_id for face in faces):
+            # Not the faces this solid had when config was written: parse it again
+            self.parse_shape(mesh_params=mesh_params, share_edges=share_edges, optimal_bbox=optimal_bbox,
+                             oriented_bbox=oriented_bbox, topology=topology)
+            config.clear()
+            config.update(self.config)
+            return set(SECTION_VERSIONS)
+
+        self.config = config
+        if 'bounding_box' in stale:
+            config.pop('oriented_bounding_box', None)
+            self.set_bounding_boxes(optimal_bbox, oriented_bbox)
+        if 'properties' in stale:
+            config['volume'], config['centroid'] = self.mass_properties
+        if 'triangles' in stale:
+            config.pop('triangles_lod', None)
+            self.set_triangles(self.compute_triangles(mesh_params))
+
+        if topology and share_edges and stale & set(['topology', 'trims']):
+            # The trims' edge ids follow the numbering of the adjacency arrays, so both are redone
+            stale.update(['topology', 'trims'])
+        rebuild_edges = (share_edges and 'trims' in stale) or (topology and 'topology' in stale)
+        edge_registry = EdgeRegistry() if rebuild_edges else None
+        if 'topology' in stale:
+            if topology:
+                with stage('extract_topology'):
+                    config['topology'] = extract_topology(self.shape, edge_registry)
+            else:
+                config.pop('topology', None)
+        # The face table holds face kinds, areas and bounding boxes
+        update_table = bool(stale & set(['bounding_box', 'properties', 'surfaces']))
+        table = FaceTable()
+        for face in faces:
+            shape_config = face_configs[face.f_id]['shape']
+            if 'bounding_box' in stale:
+                shape_config['bounding_box'] = face.bounding_box
+            if 'surfaces' in stale or 'trims' in stale:
+                geometry, trims = face.surface.split_trims(shape_config['data'])
+                if 'surfaces' in stale:
+                    geometry = face.geometry
+                    shape_config['type'] = face.surface.shape_type
+                if 'trims' in stale:
+                    face.surface.edge_registry = edge_registry if share_edges else None
+                    trims = face.trims
+                shape_config['data'] = face.surface.add_trims(geometry, trims)
+            if update_table:
+                table.add(face.f_id, shape_config['data'].get('kind'), face.area, shape_config['bounding_box'])
+        if update_table:
+            config['face_table'] = table.fill({})
+        if edge_registry is not None:
+            config['edges'] = edge_registry.edges
+        elif 'trims' in stale and not topology:
+            config.pop('edges', None)
+        config['versions'] = dict(SECTION_VERSIONS)
+        return stale
+
+    def iter_faces(self, edge_registry=None, face_table=None):
+        """Yield the config of every supported face, in 'face_id' order. face_table, if given,
+        is filled with the faces' properties (see properties.FaceTable) after the last one."""
+        table = FaceTable()
         f_id = 1
         t = TopologyExplorer(self.shape)
-        for subshape in t.faces():
-            surface_factory = SurfaceFactory()
-            surface = surface_factory.create_surface_object(subshape, f_id)
+        with stage('traverse_topology'):
+            faces = list(t.faces())
+        for subshape in faces:
+            # The stage is left before yielding so it never stays open while the consumer runs
+            with stage('extract_surfaces'):
+                surface_factory = SurfaceFactory()
+                surface = surface_factory.create_surface_object(subshape, f_id)
+                count('faces.' + (type(surface).__name__ if surface is not None else 'unsupported'))
+                if surface is not None:
+                    surface.edge_registry = edge_registry
+                    surface.extract_data()
             if surface is not None:
-                surface.extract_data()
-            
-            
-                
-            # print(surface)
-                self.config['data'].append(surface.config)
+                with stage('face_properties'):
+                    shape_config = surface.config['shape']
+                    table.add(f_id, shape_config['data'].get('kind'), face_area(subshape),
+                              shape_config['bounding_box'])
+                yield surface.config
             f_id = f_id + 1
+        if face_table is not None:
+            table.fill(face_table)
             
             
             
-    def triangulate_solid(self):
-        
-        mesh = BRepMesh_IncrementalMesh(self.shape, 0.3, False, 0.5, True)
-        mesh.Perform()
-        
-        b = BRep_Tool()
-        ex = TopExp_Explorer(self.shape, TopAbs_FACE)
-        faces = []
-        verts = []
-        while ex.More():
-            face = topods_Face(ex.Current())
-            location = TopLoc_Location()
-            triang_face = (b.Triangulation(face,location))
-            
-            if triang_face != None:
-                tab = triang_face.Nodes()
-                tri = triang_face.Triangles()
-                
-
-                for i in range(1, triang_face.NbTriangles() + 1):
-                    try:
-                        verts.append(list(tab.Value(i).Coord()))
-                    except:
-                        continue
-
-
-                
-                for i in range(1, triang_face.NbTriangles()+1):
-                    try:
-                        index1, index2, index3 = tri.Value(i).Get()
-                        faces.append([index1-1, index2 - 1, index3-1])
-                    except:
-                        continue
-        
-            ex.Next()
-       
-        
-                
-
-
-            
-        return verts, faces
+    def triangulate_solid(self, mesh_params=None):
+        # One merged vertex / triangle buffer for the whole solid, see mesh.collect_triangulation
+        return triangulate_shape(self.shape, mesh_params)
             
         
 
 
 
     
-    def get_bounding_box(self,tol=TOLERANCE):
-        bbox = Bnd_Box()
-        brepbndlib_Add(self.shape, bbox)
-        xmin, ymin, zmin, xmax, ymax, zmax = bbox.Get()
-        return ["%.2f"%xmin, "%.2f"%ymin, "%.2f"%zmin, "%.2f"%xmax, "%.2f"%ymax, "%.2f"%zmax, "%.2f"%(xmax-xmin), "%.2f"%(ymax-ymin), "%.2f"%(zmax-zmin)]
-
-
-    def volume():
-        pass
+    def get_bounding_box(self, optimal=False):
+        return bounding_box(self.shape, optimal)
 
 
 
@@ -178,19 +385,119 @@ class Compound(Topology):
         self.shape = shape
         self.shape_type = shape_type
         self.config = {}
+
+    @lazy_property
+    def solids(self):
+        """The compound's solids as lazy Solid objects, in 'solid id' order."""
+        return [Solid(subshape, "Solid", s_id)
+                for s_id, subshape in enumerate(TopologyExplorer(self.shape).solids(), 1)]
     
 
-    def parse_shape(self):
+    def parse_shape(self, mesh_params=None, solid_workers=None, solid_executor='process', mesh_compound=False,
+                    share_edges=False, stream=False, optimal_bbox=False, oriented_bbox=False, topology=False):
+        """Parse every solid of the compound, in 'solid id' order.
+
+        With solid_workers > 1 the solids are parsed concurrently, either on a process pool
+        (solid_executor='process': each solid is handed over as a BRep file to a spawned
+        process, which keeps this process's mesh.set_mesh_threads bound) or on a thread
+        pool ('thread', only useful where OCC releases the GIL). The output is identical to
+        the sequential parse.
+
+        With mesh_compound the whole compound is meshed once with parallel BRepMesh (see
+        mesh.set_mesh_threads for bounding its threads) and each solid gets its slice of
+        that mesh, instead of every solid being meshed on its own.
+
+        mesh_params, share_edges, optimal_bbox, oriented_bbox and topology are passed on to
+        Solid.parse_shape. With stream the sequential parse yields the solids (and their faces)
+        lazily from 'data'; the concurrent parses ignore it and return fully parsed solids.
+        """
         assert self.shape_type is "Compound"
         self.config['shape'] = self.shape_type
         self.config['data'] = []
+        solids = list(TopologyExplorer(self.shape).solids())
+        solid_options = {'mesh_params': mesh_params, 'share_edges': share_edges, 'optimal_bbox': optimal_bbox,
+                         'oriented_bbox': oriented_bbox, 'topology': topology}
+        triangles = [None] * len(solids)
+        if mesh_compound:
+            with stage('triangulate_compound'):
+                triangles = self.triangulate_compound(solids, mesh_params)
+
+        if not solid_workers or solid_workers <= 1:
+            solid_configs = self.iter_solids(solids, triangles, dict(solid_options, stream=stream))
+            self.config['data'] = solid_configs if stream else list(solid_configs)
+        elif solid_executor == 'thread':
+            solids = [Solid(subshape, "Solid", s_id) for s_id, subshape in enumerate(solids, 1)]
+            with ThreadPoolExecutor(solid_workers) as executor:
+                list(executor.map(lambda solid: solid.parse_shape(triangles=triangles[solid.s_id - 1],
+                                                                  **solid_options), solids))
+            self.config['data'] = [solid.config for solid in solids]
+        elif solid_executor == 'process':
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                filenames = []
+                for s_id, subshape in enumerate(solids, 1):
+                    filenames.append(os.path.join(tmp_dir, "solid_%d.brep" % s_id))
+                    write_brep(subshape, filenames[-1])
+                # Spawned rather than forked: forking a process whose OCC thread pool already ran
+                # parallel BRepMesh can deadlock the child
+                with ProcessPoolExecutor(solid_workers, mp_context=multiprocessing.get_context('spawn'),
+                                         initializer=_init_solid_process, initargs=(mesh_threads(),)) as executor:
+                    # map() returns results in submission order, so solid ids stay in order
+                    results = list(executor.map(_parse_solid_file, filenames, range(1, len(filenames) + 1),
+                                                triangles, [solid_options] * len(filenames)))
+                self.config['data'] = [config for config, metrics in results]
+                for config, metrics in results:
+                    merge_metrics(metrics)
+        else:
+            raise ValueError("Unknown solid_executor %r, expected 'process' or 'thread'" % solid_executor)
+
+    def update_config(self, config, mesh_params=None, share_edges=False, optimal_bbox=False, oriented_bbox=False,
+                      topology=False):
+        """Solid.update_config for every solid of an earlier parse_shape output of this compound.
+        Returns the names of the sections recomputed in any solid."""
+        solid_options = {'mesh_params': mesh_params, 'share_edges': share_edges, 'optimal_bbox': optimal_bbox,
+                         'oriented_bbox': oriented_bbox, 'topology': topology}
+        if len(config.get('data', [])) != len(self.solids):
+            self.parse_shape(**solid_options)
+            config.clear()
+            config.update(self.config)
+            return set(SECTION_VERSIONS)
+        self.config = config
+        stale = set()
+        for solid, solid_config in zip(self.solids, config['data']):
+            stale.update(solid.update_config(solid_config, **solid_options))
+        return stale
+
+    def iter_solids(self, solids, triangles, solid_options):
         s_id = 1
-        t = TopologyExplorer(self.shape)
-        for subshape in t.solids():
+        for subshape in solids:
             print(s_id)
             solid = Solid(subshape, "Solid", s_id)
-            solid.parse_shape()
-            self.config['data'].append(solid.config)
+            solid.parse_shape(triangles=triangles[s_id - 1], **solid_options)
+            yield solid.config
             s_id = s_id + 1
 
+    def triangulate_compound(self, solids, mesh_params=None):
+        """Mesh the compound once per level of detail and return each solid's triangulation(s)."""
+        if not isinstance(mesh_params, list):
+            return triangulate_parts(self.shape, solids, mesh_params)
+        levels = []
+        for level_params in mesh_params:
+            breptools_Clean(self.shape)
+            levels.append(triangulate_parts(self.shape, solids, level_params))
+        return [list(solid_levels) for solid_levels in zip(*levels)]
+
+
+def _init_solid_process(n_threads):
+    clear_stage_listeners()
+    if n_threads:
+        set_mesh_threads(n_threads)
+
+
+def _parse_solid_file(filename, s_id, triangles, solid_options):
+    # Stages and counters of the pool process go back to the parent with the result
+    with collect_metrics() as metrics:
+        solid = Solid(read_brep(filename), "Solid", s_id)
+        solid.parse_shape(triangles=triangles, **solid_options)
+    return solid.config, metrics.as_dict()
+
         
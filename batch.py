@@ -0,0 +1,412 @@
+import os
+import time
+import zlib
+import hashlib
+import signal
+import resource
+import multiprocessing
+from multiprocessing.connection import wait
+
+from OCC.Extend.TopologyUtils import get_type_as_string
+from OCC.Extend.DataExchange import read_step_file
+from abstract import *
+from manifest import file_key
+from instrument import stage, add_stage_listener, collect_metrics, profile, count, Metrics
+from writers import write_output, read_output, output_extension
+from mesh import set_mesh_threads
+from cache import ResultCache, cache_key, content_hash
+from brep_io import ShapeCache
+from versions import is_stale
+# parse_shape options that only Compound understands
+COMPOUND_OPTIONS = ['solid_workers', 'solid_executor', 'mesh_compound']
+# parse_shape options that update_config understands
+UPDATE_OPTIONS = ['mesh_params', 'share_edges', 'optimal_bbox', 'oriented_bbox', 'topology']
+# Bytes of shared memory holding the name of a worker's current stage
+STAGE_NAME_SIZE = 64
+
+
+def relative_name(filename, input_root=None):
+    """Name of filename's outputs, without extension: its path relative to input_root, so files
+    of the same name in different folders do not collide. A file outside input_root (or any
+    file without one) is named after its basename and a hash of its folder."""
+    if input_root is not None:
+        relative = os.path.relpath(filename, input_root)
+        if relative != os.pardir and not relative.startswith(os.pardir + os.sep):
+            return os.path.splitext(relative)[0]
+    folder = os.path.dirname(os.path.abspath(filename))
+    return '%s-%s' % (os.path.splitext(os.path.basename(filename))[0],
+                      hashlib.blake2b(folder.encode('utf-8'), digest_size=4).hexdigest())
+
+
+def default_mesh_threads(workers, parse_options=None):
+    """Threads each parallel BRepMesh may use when workers processes each parse up to
+    parse_options['solid_workers'] solids at once, so all of them together fit in the cores."""
+    solid_workers = max(1, (parse_options or {}).get('solid_workers') or 1)
+    return max(1, (os.cpu_count() or 1) // (workers * solid_workers))
+
+
+def output_filename(filename, output_dir, output_format='json', input_root=None):
+    return os.path.join(output_dir, relative_name(filename, input_root) + output_extension(output_format))
+
+
+def load_step_file(filename, shape_cache=None, digest=None):
+    """The shape of a STEP file, from the shape_cache (a brep_io.ShapeCache) when it holds it.
+    Translated shapes are added to the cache. digest is content_hash(filename) if known."""
+    if shape_cache is not None:
+        if digest is None:
+            with stage('hash_file'):
+                digest = content_hash(filename)
+        with stage('read_shape_cache'):
+            shp = shape_cache.load(digest)
+        if shp is not None:
+            count('shape_cache_hits')
+            return shp
+    with stage('read_step_file'):
+        shp = read_step_file(filename)
+    if shape_cache is not None:
+        with stage('write_shape_cache'):
+            shape_cache.save(digest, shp)
+    return shp
+
+
+def create_shape_object(filename, shape_cache=None, digest=None):
+    shp = load_step_file(filename, shape_cache, digest)
+    shape_type = get_type_as_string(shp)
+    t = TopologyFactory(shape_type)
+    return t.create_shape_object(shp)
+
+
+def parse_step_file(filename, parse_options=None, shape_cache=None, digest=None):
+    shape = create_shape_object(filename, shape_cache, digest)
+    options = dict(parse_options or {})
+    if not isinstance(shape, Compound):
+        for key in COMPOUND_OPTIONS:
+            options.pop(key, None)
+    shape.parse_shape(**options)
+    return shape
+
+
+def update_output(filename, config, parse_options=None, shape_cache=None, digest=None):
+    """Recompute the stale sections of config, the existing output of filename, in place (see
+    versions.py); the STEP file is not even read when none is stale. Returns the recomputed sections."""
+    if not is_stale(config):
+        return set()
+    shape = create_shape_object(filename, shape_cache, digest)
+    options = dict((key, value) for key, value in (parse_options or {}).items() if key in UPDATE_OPTIONS)
+    with stage('update_output'):
+        return shape.update_config(config, **options)
+
+
+def convert_file(filename, output_dir, output_format='json', parse_options=None, cache=None, shape_cache=None,
+                 update=False, input_root=None):
+    with collect_metrics() as metrics:
+        record = _convert_file(filename, output_dir, output_format, parse_options, cache, shape_cache, update,
+                               input_root)
+    record['metrics'] = metrics.as_dict()
+    return record
+
+
+def _convert_file(filename, output_dir, output_format='json', parse_options=None, cache=None, shape_cache=None,
+                  update=False, input_root=None):
+    """Parse one STEP file and write it in output_format under output_dir, at its path relative
+    to input_root (see relative_name).
+
+    With a cache.ResultCache, a file whose content was converted before with the same
+    settings is linked from the cache instead ('cached' is set in the record). With a
+    brep_io.ShapeCache, a file translated before is loaded from its BRep. With update, an
+    existing output only gets its stale sections recomputed ('updated' lists them). The record's
+    'metrics' hold the time spent in every parse stage and counters such as faces by type.
+    Never raises: failures are reported through the 'status' of the returned record.
+    """
+    record = {'input': filename, 'output': None, 'status': 'ok', 'error': None}
+    start = time.perf_counter()
+    try:
+        record['size'], record['mtime_ns'] = file_key(filename)
+        out_filename = output_filename(filename, output_dir, output_format, input_root)
+        os.makedirs(os.path.dirname(out_filename), exist_ok=True)
+        digest = None
+        if cache is not None:
+            with stage('hash_file'):
+                digest = content_hash(filename)
+                key = cache_key(filename, output_format, parse_options, digest)
+            if cache.fetch(key, output_extension(output_format), out_filename):
+                record['output'] = out_filename
+                record['cached'] = True
+                record['seconds'] = time.perf_counter() - start
+                return record
+        changed = True
+        if update and os.path.exists(out_filename):
+            with stage('read_output'):
+                config = read_output(out_filename, output_format)
+            record['updated'] = sorted(update_output(filename, config, parse_options, shape_cache, digest))
+            changed = bool(record['updated'])
+        else:
+            config = parse_step_file(filename, parse_options, shape_cache, digest).config
+        if changed:
+            # Write to a temporary name first so a killed run never leaves a truncated output behind
+            with stage('write_output'):
+                write_output(config, out_filename + '.tmp', output_format)
+            os.replace(out_filename + '.tmp', out_filename)
+        record['output'] = out_filename
+        if cache is not None:
+            cache.store(key, output_extension(output_format), out_filename)
+    except KeyError:
+        record['status'] = 'invalid_shape'
+        record['error'] = "Some Invalid Shape"
+    except MemoryError:
+        record['status'] = 'memory'
+        record['error'] = "Memory limit exceeded"
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = repr(e)
+    record['seconds'] = time.perf_counter() - start
+    return record
+
+
+def profiled(filename, profile_options):
+    """Whether filename is in the profiled sample: a stable fraction of files, chosen by name."""
+    if not profile_options or not profile_options.get('fraction'):
+        return False
+    return zlib.crc32(filename.encode('utf-8')) % 10000 < profile_options['fraction'] * 10000
+
+
+def _write_stage(stage_name, stage_started):
+    def listener(name, timestamp):
+        stage_name.value = (name or '').encode('ascii', 'replace')[:STAGE_NAME_SIZE - 1]
+        stage_started.value = timestamp
+    return listener
+
+
+def _worker_main(conn, stage_name, stage_started, output_dir, output_format, parse_options, max_files, memory_limit,
+                 mesh_threads, cache_dir, shape_cache_dir, update, profile_options, input_root):
+    # OCC and the parser modules are imported once per worker, then reused for every file it is handed.
+    # The worker leads its own process group so that killing it also kills any solid-parsing pool it started.
+    os.setpgid(0, 0)
+    if mesh_threads:
+        set_mesh_threads(mesh_threads)
+    if memory_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    # Keep the current stage in memory shared with the parent, which reads it only when it has to
+    # kill the worker: a pipe message per stage change would cost several round trips per face
+    add_stage_listener(_write_stage(stage_name, stage_started))
+    cache = ResultCache(cache_dir) if cache_dir else None
+    shape_cache = ShapeCache(shape_cache_dir) if shape_cache_dir else None
+    n_files = 0
+    while not max_files or n_files < max_files:
+        conn.send(('ready', None))
+        filename = conn.recv()
+        if filename is None:
+            break
+        if profiled(filename, profile_options):
+            report = os.path.join(profile_options['dir'], relative_name(filename, input_root))
+            report = report + ('.prof' if profile_options.get('profiler', 'cprofile') == 'cprofile' else '.html')
+            os.makedirs(os.path.dirname(report), exist_ok=True)
+            with profile(report, profile_options.get('profiler', 'cprofile')):
+                result = convert_file(filename, output_dir, output_format, parse_options, cache, shape_cache,
+                                      update, input_root)
+        else:
+            result = convert_file(filename, output_dir, output_format, parse_options, cache, shape_cache, update,
+                                  input_root)
+        conn.send(('done', result))
+        n_files = n_files + 1
+    conn.close()
+
+
+class Worker:
+    """A long-lived parser process that is handed one file at a time over a pipe."""
+
+    def __init__(self, context, output_dir, output_format, parse_options, max_files, memory_limit, mesh_threads,
+                 cache_dir, shape_cache_dir, update, profile_options, input_root):
+        self.conn, child_conn = context.Pipe()
+        # Written by the worker on every stage change (see instrument.add_stage_listener)
+        self.stage_name = context.Array('c', STAGE_NAME_SIZE, lock=False)
+        self.stage_started = context.Value('d', 0.0, lock=False)
+        self.process = context.Process(target=_worker_main,
+                                       args=(child_conn, self.stage_name, self.stage_started, output_dir,
+                                             output_format, parse_options, max_files, memory_limit, mesh_threads,
+                                             cache_dir, shape_cache_dir, update, profile_options, input_root))
+        self.process.start()
+        child_conn.close()
+        self.filename = None
+        self.killed = False
+        self.started = None
+
+    def send(self, filename):
+        self.filename = filename
+        self.started = time.monotonic()
+        self.conn.send(filename)
+
+    def failure(self, status, error):
+        """Result record for the file this worker was handling when it was killed or died."""
+        now = time.monotonic()
+        # The worker wrote no stage for this file yet if the last one is older than the file
+        stage_started = max(self.started, self.stage_started.value)
+        stage = self.stage_name.value.decode('ascii') if self.stage_started.value >= self.started else ''
+        return {'input': self.filename, 'output': None, 'status': status, 'error': error,
+                'seconds': now - self.started, 'stage': stage or None, 'stage_seconds': now - stage_started}
+
+    def kill(self):
+        self.killed = True
+        self.filename = None
+        self.kill_group()
+
+    def kill_group(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            self.process.kill()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+
+    def close(self):
+        self.process.join()
+        self.conn.close()
+
+
+class BatchRunner:
+    """Feed a list of STEP files through a pool of recycled worker processes.
+
+    output_format         one of writers.WRITERS ('json', 'npz')
+    parse_options         keyword arguments for parse_shape (e.g. mesh_params)
+    workers               number of worker processes (defaults to the CPU count)
+    max_files_per_worker  a worker exits and is replaced after this many files,
+                          which bounds the memory OCC leaks per process (0 = never)
+    timeout               wall-clock seconds a single file may take before its worker is killed
+    memory_limit          address-space limit in bytes for each worker process
+    mesh_threads          threads each parallel BRepMesh may use; defaults to an equal share of
+                          the cores across the workers and their solid_workers (default_mesh_threads)
+                          so the pool never oversubscribes the machine
+    cache_dir             cache.ResultCache directory shared by the workers; files whose content
+                          was already converted with the same settings are linked from it
+    shape_cache_dir       brep_io.ShapeCache directory shared by the workers; STEP files translated
+                          before are loaded from their binary BRep instead of translated again
+    update                outputs that already exist only get the sections whose version changed
+                          recomputed (see versions.py) instead of the file being parsed again
+    profile_options       {'dir', 'fraction', 'profiler'}: profile this fraction of the files
+                          (cProfile, or pyinstrument) and write one report per file to dir
+    on_result             optional callback invoked in the parent with every result record
+    input_root            folder the inputs were found in; outputs (and profiles) mirror their
+                          paths relative to it, so equal file names in different folders don't collide
+
+    A file whose worker is killed or crashes is recorded with status 'timeout' or 'crash'
+    along with the parse stage it was in and how long it had been in that stage. The per-file
+    metrics of all results are summed into the 'metrics' entry of the run's summary.
+    """
+
+    def __init__(self, output_dir, output_format='json', parse_options=None, workers=None, max_files_per_worker=100,
+                 timeout=None, memory_limit=None, mesh_threads=None, cache_dir=None, shape_cache_dir=None,
+                 update=False, profile_options=None, on_result=None, log_every=100, input_root=None):
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.parse_options = parse_options or {}
+        self.workers = workers or os.cpu_count()
+        self.max_files_per_worker = max_files_per_worker
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.mesh_threads = mesh_threads or default_mesh_threads(self.workers, self.parse_options)
+        self.cache_dir = cache_dir
+        self.shape_cache_dir = shape_cache_dir
+        self.update = update
+        self.profile_options = profile_options
+        self.on_result = on_result
+        self.log_every = log_every
+        self.input_root = input_root
+        self.context = multiprocessing.get_context()
+
+    def run(self, filenames):
+        os.makedirs(self.output_dir, exist_ok=True)
+        pending = list(reversed(filenames))
+        total = len(filenames)
+        summary = {'total': total, 'done': 0}
+        metrics = Metrics()
+        start = time.perf_counter()
+
+        workers = [self._spawn() for _ in range(min(self.workers, total))]
+        try:
+            self._run(workers, pending, summary, metrics, start)
+        except BaseException:
+            # The workers lead their own process groups, out of the terminal's foreground group,
+            # so Ctrl-C only reaches the parent: kill them (and their solid pools) on the way out
+            for worker in workers:
+                worker.kill_group()
+            for worker in workers:
+                worker.close()
+            raise
+
+        summary['metrics'] = metrics.as_dict()
+        summary['seconds'] = time.perf_counter() - start
+        summary['files_per_sec'] = summary['done'] / summary['seconds'] if summary['seconds'] > 0 else 0.0
+        return summary
+
+    def _run(self, workers, pending, summary, metrics, start):
+        while workers:
+            ready = wait([w.conn for w in workers], timeout=self._poll_interval(workers))
+            for worker in [w for w in workers if w.conn in ready]:
+                try:
+                    message, payload = worker.conn.recv()
+                except EOFError:
+                    # The worker retired after max_files_per_worker files, or died while parsing
+                    workers.remove(worker)
+                    if worker.filename is not None:
+                        worker.kill_group()
+                    worker.close()
+                    if worker.filename is not None:
+                        error = "Worker exited with code %s" % worker.process.exitcode
+                        self._record(worker.failure('crash', error), summary, start)
+                    if pending and len(workers) < self.workers:
+                        workers.append(self._spawn())
+                    continue
+
+                if worker.killed:
+                    # Drain whatever it sent before being killed; its file is already recorded
+                    continue
+                elif message == 'ready':
+                    if pending:
+                        worker.send(pending.pop())
+                    else:
+                        worker.stop()
+                elif message == 'done':
+                    worker.filename = None
+                    metrics.merge(payload.get('metrics', {}))
+                    self._record(payload, summary, start)
+
+            for worker in self._expired(workers):
+                self._record(worker.failure('timeout', "Killed after %.0f s" % self.timeout), summary, start)
+                worker.kill()
+                # The pipe reports EOF on the next wait(), which removes and replaces the worker
+
+    def _spawn(self):
+        return Worker(self.context, self.output_dir, self.output_format, self.parse_options,
+                      self.max_files_per_worker, self.memory_limit, self.mesh_threads, self.cache_dir,
+                      self.shape_cache_dir, self.update, self.profile_options, self.input_root)
+
+    def _expired(self, workers):
+        if not self.timeout:
+            return []
+        now = time.monotonic()
+        return [w for w in workers if w.filename is not None and now - w.started > self.timeout]
+
+    def _poll_interval(self, workers):
+        if not self.timeout:
+            return None
+        busy = [w.started for w in workers if w.filename is not None]
+        if not busy:
+            return None
+        return max(0.0, min(busy) + self.timeout - time.monotonic()) + 0.01
+
+    def _record(self, record, summary, start):
+        summary['done'] = summary['done'] + 1
+        summary[record['status']] = summary.get(record['status'], 0) + 1
+        if record.get('cached'):
+            summary['cached'] = summary.get('cached', 0) + 1
+        if record.get('updated'):
+            summary['updated'] = summary.get('updated', 0) + 1
+        if self.on_result is not None:
+            self.on_result(record)
+        if self.log_every and summary['done'] % self.log_every == 0:
+            elapsed = time.perf_counter() - start
+            print("%d/%d files, %.2f files/sec" % (summary['done'], summary['total'], summary['done'] / elapsed))
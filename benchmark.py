@@ -0,0 +1,214 @@
+"""Benchmark the parse pipeline stage by stage and compare against a stored baseline.
+
+Fixtures are generated locally with OCC: assemblies of primitive solids (planes,
+cylinders, cones, spheres, tori) and the same assemblies converted to NURBS, in
+three sizes, plus the sample file shipped with the repository. Every fixture is
+benchmarked in a fresh process so its peak RSS is its own.
+
+    python benchmark.py --save-baseline            # record benchmark_baseline.json
+    python benchmark.py                            # compare, exit 1 on a regression
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import tempfile
+import multiprocessing
+
+from OCC.Core.BRep import BRep_Builder
+from OCC.Core.BRepBuilderAPI import BRepBuilderAPI_NurbsConvert, BRepBuilderAPI_Transform
+from OCC.Core.BRepPrimAPI import (BRepPrimAPI_MakeBox, BRepPrimAPI_MakeCylinder, BRepPrimAPI_MakeCone,
+                                  BRepPrimAPI_MakeSphere, BRepPrimAPI_MakeTorus)
+from OCC.Core.BRepTools import breptools_Clean
+from OCC.Core.TopoDS import TopoDS_Compound
+from OCC.Core.gp import gp_Trsf, gp_Vec
+from OCC.Extend.DataExchange import read_step_file, write_step_file
+from OCC.Extend.TopologyUtils import TopologyExplorer, get_type_as_string
+
+from abstract import TopologyFactory
+from surface import SurfaceFactory
+from mesh import triangulate_shape
+from writers import write_output
+from brep_io import write_binary_brep, read_binary_brep
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           '00000000_290a9120f9f249a7a05cfe9c_step_000.step')
+
+# Number of solids per fixture size
+SIZES = {'small': 5, 'medium': 50, 'huge': 500}
+KINDS = ['primitive', 'nurbs']
+
+
+def make_solid(i):
+    makers = [lambda: BRepPrimAPI_MakeBox(10, 20, 30),
+              lambda: BRepPrimAPI_MakeCylinder(5, 20),
+              lambda: BRepPrimAPI_MakeCone(8, 2, 15),
+              lambda: BRepPrimAPI_MakeSphere(7),
+              lambda: BRepPrimAPI_MakeTorus(10, 3)]
+    solid = makers[i % len(makers)]().Shape()
+    trsf = gp_Trsf()
+    trsf.SetTranslation(gp_Vec(40.0 * (i % 10), 40.0 * ((i // 10) % 10), 40.0 * (i // 100)))
+    return BRepBuilderAPI_Transform(solid, trsf, True).Shape()
+
+
+def make_fixture(kind, n_solids):
+    builder = BRep_Builder()
+    compound = TopoDS_Compound()
+    builder.MakeCompound(compound)
+    for i in range(n_solids):
+        solid = make_solid(i)
+        if kind == 'nurbs':
+            solid = BRepBuilderAPI_NurbsConvert(solid, True).Shape()
+        builder.Add(compound, solid)
+    return compound
+
+
+def fixture_files(fixture_dir, sizes):
+    """name -> STEP file of every fixture, writing the generated ones that are missing."""
+    os.makedirs(fixture_dir, exist_ok=True)
+    fixtures = {'abc-sample': SAMPLE_FILE}
+    for kind in KINDS:
+        for size in sizes:
+            name = '%s-%s' % (kind, size)
+            filename = os.path.join(fixture_dir, name + '.step')
+            if not os.path.exists(filename):
+                write_step_file(make_fixture(kind, SIZES[size]), filename)
+            fixtures[name] = filename
+    return fixtures
+
+
+def _timed(function, repeat):
+    """Best wall time of repeat runs of function(), and its last result."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_fixture(filename, repeat):
+    """Time every stage on one file; runs in its own process (see run_benchmarks)."""
+    results = {}
+    seconds, shape = _timed(lambda: read_step_file(filename), repeat)
+    results['load'] = seconds
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Loading the same shape from a shape cache entry instead of translating the STEP file
+        brep_filename = os.path.join(tmp_dir, 'shape.bbrep')
+        write_binary_brep(shape, brep_filename)
+        results['load_brep'], _ = _timed(lambda: read_binary_brep(brep_filename), repeat)
+    seconds, faces = _timed(lambda: list(TopologyExplorer(shape).faces()), repeat)
+    results['traverse'] = seconds
+
+    def surfaces():
+        handlers = []
+        for f_id, face in enumerate(faces, 1):
+            handler = SurfaceFactory().create_surface_object(face, f_id)
+            if handler is not None:
+                handler.extract_geometry()
+                handlers.append(handler)
+        return handlers
+    seconds, handlers = _timed(surfaces, repeat)
+    results['surfaces'] = seconds
+    results['trims'], _ = _timed(lambda: [handler.extract_trims_curves() for handler in handlers], repeat)
+
+    def triangulate():
+        breptools_Clean(shape)
+        return triangulate_shape(shape)
+    seconds, triangulation = _timed(triangulate, repeat)
+    results['triangulate'] = seconds
+
+    def parse():
+        # The whole pipeline, meshing included
+        breptools_Clean(shape)
+        parsed = TopologyFactory(get_type_as_string(shape)).create_shape_object(shape)
+        parsed.parse_shape()
+        return parsed
+    seconds, parsed = _timed(parse, repeat)
+    results['parse'] = seconds
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for output_format in ['json', 'npz']:
+            out = os.path.join(tmp_dir, 'out.' + output_format)
+            results['write_' + output_format], _ = _timed(
+                lambda: write_output(parsed.config, out, output_format), repeat)
+
+    return {'seconds': results,
+            'faces': len(faces),
+            'supported_faces': len(handlers),
+            'triangles': len(triangulation['triangles']),
+            'size': os.path.getsize(filename),
+            # ru_maxrss is in kilobytes on Linux
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0}
+
+
+def run_benchmarks(fixtures, repeat=3):
+    results = {}
+    context = multiprocessing.get_context('fork')
+    for name, filename in fixtures.items():
+        with context.Pool(1, maxtasksperchild=1) as pool:
+            results[name] = pool.apply(bench_fixture, (filename, repeat))
+        results[name]['faces_per_sec'] = results[name]['faces'] / results[name]['seconds']['parse']
+        print("%-18s %6d faces  parse %7.3f s  peak %7.1f MB" % (
+            name, results[name]['faces'], results[name]['seconds']['parse'], results[name]['peak_rss_mb']))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Stages (and peak RSS) that got slower (larger) than baseline by more than threshold."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for stage_name, seconds in result['seconds'].items():
+            before = base['seconds'].get(stage_name)
+            # Stages too short to time reliably are not compared
+            if before and before > 1e-3 and seconds > before * (1 + threshold):
+                regressions.append((name, stage_name, before, seconds))
+        if base.get('peak_rss_mb') and result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + threshold):
+            regressions.append((name, 'peak_rss_mb', base['peak_rss_mb'], result['peak_rss_mb']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the STEP parser stage by stage.")
+    parser.add_argument('--fixtures', default=os.path.join(tempfile.gettempdir(), 'stepfileparser-fixtures'),
+                        help="directory of the generated fixtures (reused between runs)")
+    parser.add_argument('--sizes', default='small,medium,huge',
+                        help="comma-separated fixture sizes out of %s" % ', '.join(SIZES))
+    parser.add_argument('--repeat', type=int, default=3, help="runs per stage; the best time is kept")
+    parser.add_argument('--baseline', default='benchmark_baseline.json')
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="relative slowdown (or memory growth) reported as a regression")
+    parser.add_argument('--output', default=None, help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    fixtures = fixture_files(args.fixtures, args.sizes.split(','))
+    results = run_benchmarks(fixtures, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=4)
+        print("Saved baseline to %s" % args.baseline)
+        return
+    if not os.path.exists(args.baseline):
+        print("No baseline at %s; run with --save-baseline first" % args.baseline)
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    for name, stage_name, before, after in regressions:
+        print("REGRESSION %s %s: %.3f -> %.3f" % (name, stage_name, before, after))
+    if regressions:
+        sys.exit(1)
+    print("No regressions against %s" % args.baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import os
+
+from OCC import VERSION as OCC_VERSION
+from OCC.Core.BRep import BRep_Builder
+from OCC.Core.BRepTools import breptools_Read, breptools_Write
+from OCC.Core.BinTools import bintools_Read, bintools_Write
+from OCC.Core.TopoDS import TopoDS_Shape
+
+from cache import ResultCache
+
+
+def write_brep(shape, filename):
+    if not breptools_Write(shape, filename):
+        raise IOError("Could not write BRep file %s" % filename)
+
+
+def read_brep(filename):
+    shape = TopoDS_Shape()
+    if not breptools_Read(shape, filename, BRep_Builder()):
+        raise IOError("Could not read BRep file %s" % filename)
+    return shape
+
+
+def write_binary_brep(shape, filename):
+    if not bintools_Write(shape, filename):
+        raise IOError("Could not write binary BRep file %s" % filename)
+
+
+def read_binary_brep(filename):
+    shape = TopoDS_Shape()
+    if not bintools_Read(shape, filename):
+        raise IOError("Could not read binary BRep file %s" % filename)
+    return shape
+
+
+class ShapeCache(ResultCache):
+    """On-disk store of translated STEP shapes in OCC's binary BRep format.
+
+    Entries are keyed by the STEP file's content hash (see cache.content_hash) and the
+    OCC version that wrote them, and loading one is much cheaper than translating the
+    STEP file again, so extraction code can be re-run over a corpus at the cost of the
+    extraction alone. Eviction works as for the output cache.
+    """
+
+    extension = '.bbrep'
+
+    def key(self, digest):
+        return '%s-occ%s' % (digest, OCC_VERSION)
+
+    def load(self, digest):
+        """The shape stored for digest, or None on a miss."""
+        entry = self.path(self.key(digest), self.extension)
+        if not os.path.exists(entry):
+            return None
+        try:
+            shape = read_binary_brep(entry)
+        except IOError:
+            # Truncated or unreadable entry: translate again and overwrite it
+            return None
+        try:
+            os.utime(entry)
+        except FileNotFoundError:
+            pass
+        return shape
+
+    def save(self, digest, shape):
+        entry = self.path(self.key(digest), self.extension)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        tmp = '%s.%d.tmp' % (entry, os.getpid())
+        write_binary_brep(shape, tmp)
+        os.replace(tmp, entry)
@@ -0,0 +1,142 @@
+"""Content-addressed store of converted outputs, so duplicate STEP files are parsed once.
+
+A file's key hashes its DATA section, so copies that differ only in the header
+(FILE_NAME carries the original path and a time stamp) share one entry, together
+with the output format and parse options the output was produced with.
+"""
+import os
+import json
+import mmap
+import shutil
+import hashlib
+
+from step_index import data_section_start
+from versions import SECTION_VERSIONS
+
+# Bump when the parser's output changes outside the versioned sections (see versions.py), so
+# stale entries are not reused; the section versions are part of every key too
+CACHE_VERSION = 3
+CHUNK_SIZE = 1 << 24
+
+
+def content_hash(filename):
+    """Hash of the DATA section of a STEP file (the whole file if it has none)."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return h.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            view = memoryview(buf)
+            try:
+                for start in range(data_section_start(buf) or 0, len(buf), CHUNK_SIZE):
+                    h.update(view[start:start + CHUNK_SIZE])
+            finally:
+                view.release()
+    return h.hexdigest()
+
+
+def cache_key(filename, output_format, parse_options=None, digest=None):
+    """Key of the output that converting filename with these settings produces. digest is
+    content_hash(filename) if the caller already has it."""
+    settings = json.dumps([CACHE_VERSION, SECTION_VERSIONS, output_format, parse_options or {}], sort_keys=True,
+                          default=str)
+    h = hashlib.blake2b(settings.encode('utf-8'), digest_size=8)
+    return (digest or content_hash(filename)) + '-' + h.hexdigest()
+
+
+def _link(src, dst):
+    """Hard link src to dst, replacing dst atomically; copy when they are on different file systems."""
+    try:
+        if os.path.samefile(src, dst):
+            # Already linked, and rename() between two links of one file would do nothing
+            return
+    except FileNotFoundError:
+        if not os.path.exists(src):
+            raise
+    tmp = '%s.%d.tmp' % (dst, os.getpid())
+    try:
+        os.unlink(tmp)
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+class ResultCache:
+    """On-disk store of outputs under root, one file per key, bounded to max_bytes.
+
+    Outputs are hard-linked in and out of the store, so a hit costs a hash and a
+    link rather than a parse, and a duplicate takes no extra space. Entries are
+    touched on every hit; evict() drops the least recently used ones. Several
+    workers may share a store: every update is a link or rename.
+    """
+
+    def __init__(self, root, max_bytes=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key, extension):
+        return os.path.join(self.root, key[:2], key + extension)
+
+    def fetch(self, key, extension, out_filename):
+        """Link the cached output for key to out_filename; False on a miss."""
+        entry = self.path(key, extension)
+        try:
+            _link(entry, out_filename)
+        except FileNotFoundError:
+            return False
+        try:
+            os.utime(entry)
+        except FileNotFoundError:
+            # Evicted in between; out_filename already holds the data
+            pass
+        return True
+
+    def store(self, key, extension, out_filename):
+        entry = self.path(key, extension)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        _link(out_filename, entry)
+
+    def entries(self, unlinked_only=False):
+        """(mtime, size, path) of every entry, or with unlinked_only of those no output is linked to."""
+        entries = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith('.tmp'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if unlinked_only and st.st_nlink > 1:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def evict(self, max_bytes=None):
+        """Remove least recently used entries until the store fits in max_bytes; return how many.
+
+        Only entries no output is linked to count: removing an entry whose data an output
+        still holds would free no space. The bound is on the space the store alone takes.
+        """
+        max_bytes = max_bytes if max_bytes is not None else self.max_bytes
+        if max_bytes is None:
+            return 0
+        entries = sorted(self.entries(unlinked_only=True))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total = total - size
+            removed = removed + 1
+        return removed
@@ -0,0 +1,325 @@
+import json
+import mmap
+import types
+import struct
+import zipfile
+
+import numpy as np
+
+FORMAT_NAME = 'stepfileparser-columnar'
+FORMAT_VERSION = 1
+
+# ndim codes stored per row of a column
+ABSENT = -1
+NONE = -2
+
+
+def _is_records(value):
+    """A list of dicts, or a list of lists of dicts (e.g. trim loops of curves), becomes a child table."""
+    if not isinstance(value, list) or not value:
+        return False
+    if all(isinstance(v, dict) for v in value):
+        return True
+    return (all(isinstance(v, list) and all(isinstance(x, dict) for x in v) for v in value)
+            and any(v for v in value))
+
+
+class _Column:
+    def __init__(self, key):
+        self.key = key
+        self.kind = None
+        self.categories = {}
+        self.rows = {}
+
+    def add(self, row, value):
+        if value is None:
+            self.rows[row] = (NONE, (), None)
+            return
+        if isinstance(value, str):
+            kind = 'str'
+            code = self.categories.setdefault(value, len(self.categories))
+            array = np.array(code, dtype=np.int64)
+        else:
+            kind = 'num'
+            try:
+                array = np.asarray(value)
+            except ValueError:
+                array = None
+            if array is not None and array.size == 0:
+                # An empty list or array fits a column of any kind, so it leaves the kind open
+                self.rows[row] = (array.ndim, array.shape, None)
+                return
+            if array is None or array.dtype.kind not in 'biuf':
+                # Ragged or non-numeric content is kept as JSON text rather than lost
+                kind = 'json'
+                code = self.categories.setdefault(json.dumps(value), len(self.categories))
+                array = np.array(code, dtype=np.int64)
+        if self.kind is None:
+            self.kind = kind
+        elif self.kind != kind:
+            raise ValueError("Column %r mixes %s and %s values" % (self.key, self.kind, kind))
+        self.rows[row] = (array.ndim, array.shape, array.ravel())
+
+    def arrays(self, n_rows):
+        ndim = np.full(n_rows, ABSENT, dtype=np.int8)
+        offsets = np.zeros(n_rows + 1, dtype=np.int64)
+        dims, chunks = [], []
+        for row in range(n_rows):
+            entry = self.rows.get(row)
+            size = 0
+            if entry is not None:
+                ndim[row] = entry[0]
+                dims.extend(entry[1])
+                if entry[2] is not None:
+                    chunks.append(entry[2])
+                    size = entry[2].size
+            offsets[row + 1] = offsets[row] + size
+        if chunks:
+            values = np.concatenate(chunks)
+        else:
+            values = np.zeros(0, dtype=np.float64 if self.kind in (None, 'num') else np.int64)
+        return {'values': values, 'offsets': offsets, 'ndim': ndim, 'dims': np.array(dims, dtype=np.int64)}
+
+    def meta(self):
+        meta = {'key': list(self.key), 'kind': self.kind or 'num'}
+        if self.kind in ('str', 'json'):
+            meta['categories'] = list(self.categories)
+        return meta
+
+
+class _Table:
+    def __init__(self, name, parent=None, key=None, wrapped=False):
+        self.name = name
+        self.parent = parent
+        self.key = key
+        self.wrapped = wrapped
+        self.parents = []
+        self.columns = {}
+        self.children = {}
+        self.order = []
+        self.n_rows = 0
+
+
+class _Builder:
+    """Flatten a parsed config tree into tables of typed columns with offset tables."""
+
+    def __init__(self):
+        self.tables = []
+
+    def table(self, name, parent=None, key=None, wrapped=False):
+        table = _Table(name, parent, key, wrapped)
+        table.index = len(self.tables)
+        self.tables.append(table)
+        return table
+
+    def add_row(self, table, row, parent_row):
+        index = table.n_rows
+        table.n_rows = table.n_rows + 1
+        table.parents.append(parent_row)
+        self._add_fields(table, index, row, ())
+        return index
+
+    def _add_fields(self, table, index, row, prefix):
+        for name, value in row.items():
+            key = prefix + (name,)
+            if isinstance(value, types.GeneratorType):
+                # Streamed records are collected: the columns need every row before they are written
+                value = list(value)
+            if isinstance(value, dict) and value:
+                self._add_fields(table, index, value, key)
+            elif _is_records(value):
+                child = table.children.get(key)
+                if child is None:
+                    wrapped = not all(isinstance(v, dict) for v in value)
+                    child = self.table(table.name + '/' + '.'.join(key), table, key, wrapped)
+                    table.children[key] = child
+                    table.order.append(('table', key))
+                for item in value:
+                    if child.wrapped:
+                        self.add_row(child, {'items': item}, index)
+                    else:
+                        self.add_row(child, item, index)
+            else:
+                column = table.columns.get(key)
+                if column is None:
+                    column = _Column(key)
+                    table.columns[key] = column
+                    table.order.append(('column', key))
+                column.add(index, value)
+
+    def finish(self):
+        arrays = {}
+        meta = {'format': FORMAT_NAME, 'version': FORMAT_VERSION, 'tables': []}
+        for table in self.tables:
+            prefix = 't%d' % table.index
+            arrays[prefix + '/parent'] = np.array(table.parents, dtype=np.int64)
+            columns = list(table.columns.values())
+            for c, column in enumerate(columns):
+                for part, array in column.arrays(table.n_rows).items():
+                    arrays['%s/c%d/%s' % (prefix, c, part)] = array
+            column_index = {column.key: c for c, column in enumerate(columns)}
+            meta['tables'].append({
+                'name': table.name,
+                'parent': table.parent.index if table.parent is not None else None,
+                'key': list(table.key) if table.key is not None else None,
+                'wrapped': table.wrapped,
+                'n_rows': table.n_rows,
+                'columns': [column.meta() for column in columns],
+                'order': [[kind, column_index[key] if kind == 'column' else table.children[key].index]
+                          for kind, key in table.order],
+            })
+        arrays['meta'] = np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8)
+        return arrays
+
+
+def write_columnar(config, filename):
+    """Write a parsed model as an uncompressed .npz of typed column arrays.
+
+    Every dict in the model is a row of a table; lists of records (solids, faces, trim
+    loops, curves) become child tables that point back to their parent row. Each leaf
+    field is a column holding all rows' values in one flat typed array, with an offsets
+    table (n_rows + 1) and the per-row shapes needed to restore the original arrays.
+    """
+    builder = _Builder()
+    builder.add_row(builder.table('root'), config, -1)
+    with open(filename, 'wb') as f:
+        np.savez(f, **builder.finish())
+
+
+def _mmap_npz(filename):
+    """Map every member of an uncompressed .npz straight from the page cache."""
+    arrays = {}
+    with open(filename, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with zipfile.ZipFile(f) as zf:
+            for info in zf.infolist():
+                if info.compress_type != zipfile.ZIP_STORED:
+                    raise ValueError("%s: member %s is compressed and cannot be memory-mapped"
+                                     % (filename, info.filename))
+                name_len, extra_len = struct.unpack('<HH', buf[info.header_offset + 26:info.header_offset + 30])
+                f.seek(info.header_offset + 30 + name_len + extra_len)
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+                arrays[info.filename[:-len('.npy')]] = np.ndarray(
+                    shape, dtype, buffer=buf, offset=f.tell(), order='F' if fortran_order else 'C')
+    return arrays
+
+
+class Column:
+    """One field of a table: all rows' values in a flat typed array plus an offsets table."""
+
+    def __init__(self, arrays, prefix, meta):
+        self.key = tuple(meta['key'])
+        self.kind = meta['kind']
+        self.categories = meta.get('categories')
+        self.values = arrays[prefix + '/values']
+        self.offsets = arrays[prefix + '/offsets']
+        self.ndim = arrays[prefix + '/ndim']
+        dims = arrays[prefix + '/dims']
+        counts = np.maximum(self.ndim, 0)
+        self._dim_offsets = np.concatenate([[0], np.cumsum(counts)])
+        self._dims = dims
+
+    def present(self, row):
+        return self.ndim[row] != ABSENT
+
+    def row(self, row):
+        """The value of this field in one row, as an array view (or a str/scalar)."""
+        ndim = self.ndim[row]
+        if ndim == ABSENT:
+            raise KeyError(self.key)
+        if ndim == NONE:
+            return None
+        shape = tuple(self._dims[self._dim_offsets[row]:self._dim_offsets[row + 1]])
+        value = self.values[self.offsets[row]:self.offsets[row + 1]].reshape(shape)
+        if value.size == 0:
+            return value
+        if self.kind == 'str':
+            return self.categories[int(value)]
+        if self.kind == 'json':
+            return json.loads(self.categories[int(value)])
+        return value
+
+
+class Table:
+    def __init__(self, arrays, index, meta):
+        self.name = meta['name']
+        self.index = index
+        self.parent_table = meta['parent']
+        self.key = tuple(meta['key']) if meta['key'] is not None else None
+        self.wrapped = meta['wrapped']
+        self.n_rows = meta['n_rows']
+        self.order = meta['order']
+        self.parent = arrays['t%d/parent' % index]
+        self.columns = [Column(arrays, 't%d/c%d' % (index, c), column)
+                        for c, column in enumerate(meta['columns'])]
+
+    def __len__(self):
+        return self.n_rows
+
+    def column(self, *key):
+        for column in self.columns:
+            if column.key == key:
+                return column
+        raise KeyError(key)
+
+
+class ColumnarFile:
+    """Reader for files produced by write_columnar; arrays are memory-mapped, not loaded."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.arrays = _mmap_npz(filename)
+        meta = json.loads(bytes(self.arrays['meta']).decode('utf-8'))
+        if meta.get('format') != FORMAT_NAME:
+            raise ValueError("%s is not a %s file" % (filename, FORMAT_NAME))
+        self.tables = [Table(self.arrays, t, table) for t, table in enumerate(meta['tables'])]
+
+    def table(self, name):
+        for table in self.tables:
+            if table.name == name:
+                return table
+        raise KeyError(name)
+
+    def to_config(self):
+        """Rebuild the nested dict model that was written (arrays become lists)."""
+        children = {}
+        for table in self.tables:
+            if table.parent_table is not None:
+                rows = {}
+                for row, parent in enumerate(table.parent):
+                    rows.setdefault(int(parent), []).append(row)
+                children[table.index] = rows
+        return self._row(self.tables[0], 0, children)
+
+    def _row(self, table, row, children):
+        config = {}
+        for kind, index in table.order:
+            if kind == 'column':
+                column = table.columns[index]
+                if not column.present(row):
+                    continue
+                value = column.row(row)
+                _set(config, column.key, value.tolist() if isinstance(value, np.ndarray) else value)
+            else:
+                child = self.tables[index]
+                items = [self._row(child, r, children) for r in children[index].get(row, [])]
+                if child.wrapped:
+                    items = [item.get('items', []) for item in items]
+                # Empty lists are stored as (empty) columns, so a child table only sets non-empty ones
+                if items:
+                    _set(config, child.key, items)
+        return config
+
+
+def _set(config, key, value):
+    for name in key[:-1]:
+        config = config.setdefault(name, {})
+    config[key[-1]] = value
+
+
+def read_columnar(filename):
+    return ColumnarFile(filename)
@@ -0,0 +1,83 @@
+from OCC.Core.BRep import BRep_Tool
+from OCC.Core.BRepAdaptor import BRepAdaptor_Curve, BRepAdaptor_Curve2d
+from OCC.Core.BRepTools import BRepTools_WireExplorer
+from OCC.Core.TopAbs import TopAbs_FORWARD, TopAbs_REVERSED
+from OCC.Extend.TopologyUtils import TopologyExplorer
+
+from NURBS_curve import CurveFactory
+from instrument import count
+
+
+def orientation_name(shape):
+    return 'reversed' if shape.Orientation() == TopAbs_REVERSED else 'forward'
+
+
+class EdgeRegistry:
+    """Table of the distinct edges of a solid, each with its 3D curve converted once.
+
+    In a closed B-rep every edge bounds two faces. Faces look their edges up here and
+    refer to them by 'edge id' (plus their own orientation and pcurve) instead of
+    converting the shared geometry twice. Edges are keyed by their forward-oriented
+    TopoDS_Edge, so both uses of an edge, which differ only in orientation, map to one id.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.edges = []
+
+    def __len__(self):
+        return len(self.edges)
+
+    def edge_id(self, edge):
+        key = edge.Oriented(TopAbs_FORWARD)
+        e_id = self.ids.get(key)
+        if e_id is None:
+            e_id = len(self.edges) + 1
+            self.ids[key] = e_id
+            count('edges')
+            self.edges.append(self.extract_edge_data(edge, e_id))
+        return e_id
+
+    def extract_edge_data(self, edge, e_id):
+        edge_info = {'edge id': e_id}
+        if BRep_Tool.Degenerated(edge):
+            # Collapsed edges (e.g. at the pole of a sphere) have no 3D curve
+            edge_info['degenerated'] = True
+            return edge_info
+        curve_adapter = BRepAdaptor_Curve(edge)
+        edge_info['interval'] = [curve_adapter.FirstParameter(), curve_adapter.LastParameter()]
+        c = CurveFactory().create_curve_object(curve_adapter, None, None, e_id)
+        edge_info['curve'] = c.extract_curve_data(None) if c is not None else {'type': 'unsupported'}
+        return edge_info
+
+
+def extract_shared_trims(surface, registry):
+    """Trim loops of a face whose edges are stored once in registry.
+
+    Loops are the face's own wires, walked in connection order, so the edges are the
+    solid's edges rather than the copies ShapeAnalysis_FreeBoundsProperties builds. Each
+    loop entry is {'edge id', 'orientation', 'pcurve'}: the edge's 3D curve lives in the
+    registry, while the pcurve is specific to this face.
+    """
+    curve_factory = CurveFactory()
+    trim_curves = []
+    for wire in TopologyExplorer(surface.face).wires():
+        loop = []
+        c_id = 1
+        wire_ex = BRepTools_WireExplorer(wire, surface.face)
+        while wire_ex.More():
+            edge = wire_ex.Current()
+            trim = {'edge id': registry.edge_id(edge), 'orientation': orientation_name(edge)}
+            c = curve_factory.create_curve_object(BRepAdaptor_Curve2d(edge, surface.face), surface.face,
+                                                  surface.surf, c_id)
+            trim['pcurve'] = c.extract_curve_data(surface.f_id) if c is not None else {'type': 'unsupported'}
+            loop.append(trim)
+            c_id = c_id + 1
+            wire_ex.Next()
+        count('trim_curves', len(loop))
+        trim_curves.append(loop)
+
+    trim_dict = {}
+    trim_dict['count'] = len(trim_curves)
+    trim_dict['data'] = trim_curves
+    return trim_dict
@@ -0,0 +1,157 @@
+import time
+import cProfile
+import threading
+from contextlib import contextmanager
+
+_stage_listeners = []
+_listener_lock = threading.Lock()
+# Each thread has its own stage stack so solids parsed on a thread pool don't interleave
+_local = threading.local()
+# The Metrics of the file being parsed, shared by all its threads (see collect_metrics)
+_metrics = None
+
+
+def _stages():
+    if not hasattr(_local, 'stages'):
+        _local.stages = []
+    return _local.stages
+
+
+def add_stage_listener(listener):
+    """Register listener(stage_name, timestamp), called whenever the active parse stage changes.
+
+    stage_name is None once the outermost stage has finished. Timestamps come from
+    time.monotonic() so they can be compared across processes on the same machine.
+    """
+    _stage_listeners.append(listener)
+
+
+def remove_stage_listener(listener):
+    _stage_listeners.remove(listener)
+
+
+def clear_stage_listeners():
+    """Drop inherited listeners, e.g. in a forked pool worker that must not write to its parent's pipe."""
+    del _stage_listeners[:]
+
+
+def current_stage():
+    stages = _stages()
+    return stages[-1] if stages else None
+
+
+def _notify():
+    if _stage_listeners:
+        now = time.monotonic()
+        with _listener_lock:
+            for listener in _stage_listeners:
+                listener(current_stage(), now)
+
+
+class Metrics:
+    """Wall / CPU time and number of calls per stage, plus named counters.
+
+    Stage times are inclusive: a stage nested in another also counts towards the
+    outer one. CPU time is the time of the thread that ran the stage.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def add_stage(self, name, wall, cpu, calls=1):
+        with self.lock:
+            totals = self.stages.setdefault(name, [0, 0.0, 0.0])
+            totals[0] = totals[0] + calls
+            totals[1] = totals[1] + wall
+            totals[2] = totals[2] + cpu
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, record):
+        """Add a record produced by as_dict(), e.g. from another process or file."""
+        for name, totals in record.get('stages', {}).items():
+            self.add_stage(name, totals['wall'], totals['cpu'], totals['calls'])
+        for name, n in record.get('counters', {}).items():
+            self.count(name, n)
+
+    def as_dict(self):
+        with self.lock:
+            return {'stages': {name: {'calls': calls, 'wall': wall, 'cpu': cpu}
+                               for name, (calls, wall, cpu) in self.stages.items()},
+                    'counters': dict(self.counters)}
+
+
+@contextmanager
+def collect_metrics():
+    """Collect the stages and counters of everything run inside into a new Metrics."""
+    global _metrics
+    previous = _metrics
+    _metrics = Metrics()
+    try:
+        yield _metrics
+    finally:
+        _metrics = previous
+
+
+def merge_metrics(record):
+    """Add a Metrics.as_dict() record (e.g. from a pool process) to the metrics being collected."""
+    if _metrics is not None:
+        _metrics.merge(record)
+
+
+def count(name, n=1):
+    """Increment a counter (faces by type, poles, triangles, ...) of the metrics being collected."""
+    if _metrics is not None:
+        _metrics.count(name, n)
+
+
+@contextmanager
+def stage(name):
+    metrics = _metrics
+    if metrics is not None:
+        wall, cpu = time.perf_counter(), time.thread_time()
+    _stages().append(name)
+    _notify()
+    try:
+        yield
+    finally:
+        _stages().pop()
+        _notify()
+        if metrics is not None:
+            metrics.add_stage(name, time.perf_counter() - wall, time.thread_time() - cpu)
+
+
+@contextmanager
+def profile(filename, profiler='cprofile'):
+    """Profile the block and write the result to filename.
+
+    'cprofile' writes pstats data (open it with snakeviz or pstats); 'pyinstrument'
+    (an optional dependency) writes its HTML report.
+    """
+    if profiler == 'cprofile':
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            prof.dump_stats(filename)
+    elif profiler == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ImportError("profiler='pyinstrument' needs the pyinstrument package")
+        prof = Profiler()
+        prof.start()
+        try:
+            yield
+        finally:
+            prof.stop()
+            with open(filename, 'w') as f:
+                f.write(prof.output_html())
+    else:
+        raise ValueError("Unknown profiler %r, expected 'cprofile' or 'pyinstrument'" % profiler)
@@ -22,6 +22,7 @@ from OCC.Core.BRepGProp import (brepgprop_LinearProperties,
 
 from OCC.Core.gp import gp_Pnt2d
 from abstract import *
+from writers import write_json
 
 def main():
     shp = read_step_file('Models/00000000_290a9120f9f249a7a05cfe9c_step_000.step')
@@ -29,8 +30,7 @@ def main():
     t =  TopologyFactory(shape_type) 
     shape = t.create_shape_object(shp)  
     shape.parse_shape()
-    with open("model2.json", "w") as f:
-        json.dump(shape.config, f, indent=4)
+    write_json(shape.config, "model2.json")
 
 
 
@@ -1,37 +1,158 @@
 import os
-import sys
 import json
+import argparse
+
+from batch import BatchRunner
+from step_index import find_step_files
+from triage import schedule, SCHEDULES
+from cache import ResultCache
+from brep_io import ShapeCache
+from manifest import Manifest
+from writers import WRITERS
 
-from OCC.Extend.TopologyUtils import get_type_as_string
-from OCC.Extend.DataExchange import read_step_file
-from abstract_cp import *
 
 def main():
-    input_folder = "{:08d}".format(int(sys.argv[1]))
-    print(int(sys.argv[1]))
-    filename = [file for file in os.listdir(os.path.join('/adarsh-lab/Aditya/ABCDataset',input_folder)) if os.path.splitext(file)[1] in ['.step', '.stp']][0]
-    filename = os.path.join('/adarsh-lab/Aditya/ABCDataset',input_folder,filename)
+    parser = argparse.ArgumentParser(description="Convert a folder tree of STEP files (e.g. the ABC Dataset) "
+                                                 "to JSON or columnar .npz.")
+    parser.add_argument('input_root', nargs='?', default='/adarsh-lab/Aditya/ABCDataset')
+    parser.add_argument('output_dir', nargs='?', default='/adarsh-lab/Anjana/Points')
+    parser.add_argument('--format', choices=sorted(WRITERS), default='json',
+                        help="output backend: pretty-printed JSON or memory-mappable columnar .npz")
+    parser.add_argument('--mesh-deflection', type=float, default=0.3,
+                        help="linear deflection of the tessellation, in model units")
+    parser.add_argument('--mesh-angle', type=float, default=0.5,
+                        help="angular deflection of the tessellation, in radians")
+    parser.add_argument('--mesh-bbox-fraction', type=float, default=None,
+                        help="use a linear deflection of this fraction of each solid's bounding box diagonal")
+    parser.add_argument('--mesh-lods', default=None,
+                        help="comma-separated bounding box fractions, one mesh level of detail each "
+                             "(e.g. 0.02,0.005,0.001)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="number of parser processes")
+    parser.add_argument('--share-edges', action='store_true',
+                        help="store each edge's 3D curve once per solid and reference it from the face trims")
+    parser.add_argument('--topology', action='store_true',
+                        help="add each solid's face / edge / vertex adjacency arrays and its edges' 3D curves")
+    parser.add_argument('--optimal-bbox', action='store_true',
+                        help="compute tight solid bounding boxes from the geometry (slower)")
+    parser.add_argument('--oriented-bbox', action='store_true',
+                        help="also store each solid's oriented bounding box")
+    parser.add_argument('--stream', action='store_true',
+                        help="extract faces while the output is written instead of building the whole model first "
+                             "(bounds memory by one face with --format json or jsonl)")
+    parser.add_argument('--solid-workers', type=int, default=0,
+                        help="parse the solids of each assembly on this many extra processes (0 = sequential)")
+    parser.add_argument('--mesh-compound', action='store_true',
+                        help="mesh each assembly once with parallel BRepMesh instead of solid by solid "
+                             "(with --mesh-bbox-fraction, solid by solid at each one's own deflection)")
+    parser.add_argument('--mesh-threads', type=int, default=0,
+                        help="threads per parallel meshing (default: cores / (workers * solid workers))")
+    parser.add_argument('--max-files-per-worker', type=int, default=100,
+                        help="recycle a worker after this many files to release leaked OCC memory (0 = never)")
+    parser.add_argument('--timeout', type=float, default=600,
+                        help="seconds a single file may take before its worker is killed (0 = no limit)")
+    parser.add_argument('--memory-limit', type=float, default=0,
+                        help="per-worker memory limit in GB (0 = no limit)")
+    parser.add_argument('--schedule', choices=['input'] + sorted(SCHEDULES), default='largest-first',
+                        help="order in which files are handed to workers: as found, by decreasing estimated "
+                             "cost, or by cost buckets")
+    parser.add_argument('--triage-size-only', action='store_true',
+                        help="estimate cost from file sizes only instead of scanning entity counts")
+    parser.add_argument('--cache', default=None,
+                        help="directory of a content-addressed output cache; duplicate files are linked from it")
+    parser.add_argument('--cache-size', type=float, default=0,
+                        help="evict least recently used cache entries beyond this many GB after the run, counting only "
+                             "entries no output links to (0 = no limit)")
+    parser.add_argument('--shape-cache', default=None,
+                        help="directory of translated shapes in binary BRep format; files translated before "
+                             "skip STEP translation")
+    parser.add_argument('--shape-cache-size', type=float, default=0,
+                        help="evict least recently used shapes beyond this many GB after the run (0 = no limit)")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="also convert again the unchanged files that failed (error, timeout, crash, ...) "
+                             "in an earlier run")
+    parser.add_argument('--update', action='store_true',
+                        help="revisit every file and recompute only the output sections whose version changed")
+    parser.add_argument('--metrics', default=None,
+                        help="write every file's stage timings and counters to this JSON Lines file")
+    parser.add_argument('--profile-fraction', type=float, default=0,
+                        help="profile this fraction of the files (chosen by name) into OUTPUT_DIR/profiles")
+    parser.add_argument('--profiler', choices=['cprofile', 'pyinstrument'], default='cprofile')
+    parser.add_argument('--manifest', default=None,
+                        help="checkpoint database used to resume an interrupted run "
+                             "(default: OUTPUT_DIR/manifest.sqlite)")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest = Manifest(args.manifest or os.path.join(args.output_dir, 'manifest.sqlite'))
+
+    filenames = find_step_files(args.input_root)
+    # An update run revisits converted files too; those already up to date are skipped without reading them
+    pending = filenames if args.update else manifest.pending(filenames, args.retry_failed)
+    print("Found %d STEP files, %d already converted or failed before" %
+          (len(filenames), len(filenames) - len(pending)))
+
+    if args.schedule != 'input':
+        pending, slow = schedule(pending, args.schedule, scan=not args.triage_size_only, workers=args.workers,
+                                 timeout=args.timeout)
+        for record in slow[:10]:
+            print("  straggler: %s (estimated cost %.0f)" % (record['input'], record['cost']))
+
+    mesh_params = {'linear_deflection': args.mesh_deflection, 'angular_deflection': args.mesh_angle,
+                   'bbox_fraction': args.mesh_bbox_fraction}
+    if args.mesh_lods:
+        mesh_params = [dict(mesh_params, bbox_fraction=float(f)) for f in args.mesh_lods.split(',')]
+
+    parse_options = {'mesh_params': mesh_params, 'share_edges': args.share_edges, 'stream': args.stream,
+                     'optimal_bbox': args.optimal_bbox, 'oriented_bbox': args.oriented_bbox, 'topology': args.topology,
+                     'solid_workers': args.solid_workers, 'mesh_compound': args.mesh_compound}
+
+    profile_options = None
+    if args.profile_fraction:
+        profile_options = {'dir': os.path.join(args.output_dir, 'profiles'), 'fraction': args.profile_fraction,
+                           'profiler': args.profiler}
+        os.makedirs(profile_options['dir'], exist_ok=True)
+
+    metrics_file = open(args.metrics, 'a') if args.metrics else None
+
+    def on_result(record):
+        manifest.record(record)
+        if metrics_file is not None and 'metrics' in record:
+            metrics_file.write(json.dumps({'input': record['input'], 'status': record['status'],
+                                           'seconds': record['seconds'], 'metrics': record['metrics']}) + '\n')
+
+    runner = BatchRunner(args.output_dir, output_format=args.format, parse_options=parse_options,
+                         workers=args.workers, max_files_per_worker=args.max_files_per_worker,
+                         timeout=args.timeout, memory_limit=int(args.memory_limit * 1024 ** 3),
+                         mesh_threads=args.mesh_threads, cache_dir=args.cache, shape_cache_dir=args.shape_cache,
+                         update=args.update, profile_options=profile_options, on_result=on_result,
+                         input_root=args.input_root)
     try:
-        shp = read_step_file(filename)
-        shape_type = get_type_as_string(shp)
-        t =  TopologyFactory(shape_type) 
-        shape = t.create_shape_object(shp)  
-        shape.parse_shape()
-        # seq=(os.path.splitext(filename)[0],"primitive",".json")
-
-        out_filename = input_folder+'.json'
-        out_filename = os.path.join('/adarsh-lab/Anjana/Points',out_filename)
-        with open(out_filename, "w") as f:
-            json.dump(shape.config, f, indent=4)
-
-    except KeyError:
-        print("Some Invalid Shape")
-    
-        
-    
-
-0
-0
+        summary = runner.run(pending)
+    finally:
+        manifest.close()
+        if metrics_file is not None:
+            metrics_file.close()
+    print("Converted %d files in %.1f s (%.2f files/sec)" % (summary['done'], summary['seconds'], summary['files_per_sec']))
+    for status in ['ok', 'invalid_shape', 'error', 'memory', 'timeout', 'crash']:
+        print("  %s: %d" % (status, summary.get(status, 0)))
+    if args.update:
+        print("  updated: %d" % summary.get('updated', 0))
+    if args.cache:
+        print("  linked from cache: %d" % summary.get('cached', 0))
+        if args.cache_size:
+            ResultCache(args.cache).evict(int(args.cache_size * 1024 ** 3))
+    if args.shape_cache:
+        print("  shapes loaded from the shape cache: %d" % summary['metrics']['counters'].get('shape_cache_hits', 0))
+        if args.shape_cache_size:
+            ShapeCache(args.shape_cache).evict(int(args.shape_cache_size * 1024 ** 3))
+    print("Time by stage (wall / cpu seconds, summed over workers):")
+    stages = summary['metrics']['stages']
+    for name in sorted(stages, key=lambda name: stages[name]['wall'], reverse=True):
+        print("  %s: %.1f / %.1f (%d calls)" % (name, stages[name]['wall'], stages[name]['cpu'], stages[name]['calls']))
+    for name, n in sorted(summary['metrics']['counters'].items()):
+        print("  %s: %d" % (name, n))
+
 
 if __name__ == '__main__':
-        main()
+    main()
@@ -0,0 +1,81 @@
+import os
+import time
+import sqlite3
+
+
+def file_key(filename):
+    """The identity a manifest entry is valid for: the file's size and modification time."""
+    st = os.stat(filename)
+    return st.st_size, st.st_mtime_ns
+
+
+class Manifest:
+    """Checkpoint of a conversion run, stored in SQLite.
+
+    One row per input file records the (size, mtime) it was parsed at, the outcome
+    ('ok', 'invalid_shape', 'error', 'memory', 'timeout', 'crash') and where the output
+    was written; killed or crashed files also keep the stage they were stuck in. The rows are
+    loaded into a dict on open so deciding whether a file still needs work is O(1).
+
+    Failed files keep their (size, mtime) too, so an unchanged file that failed (possibly
+    after the whole timeout) is not tried again unless asked to.
+    """
+
+    def __init__(self, filename, commit_every=100):
+        self.filename = filename
+        self.commit_every = commit_every
+        self.uncommitted = 0
+        self.conn = sqlite3.connect(filename)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS files ("
+                          "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, status TEXT, "
+                          "output TEXT, error TEXT, seconds REAL, stage TEXT, stage_seconds REAL, updated REAL)")
+        self.conn.commit()
+        self.entries = {}
+        for path, size, mtime_ns, status, output in self.conn.execute(
+                "SELECT path, size, mtime_ns, status, output FROM files"):
+            self.entries[path] = (size, mtime_ns, status, output)
+
+    def is_done(self, filename, retry_failed=False):
+        entry = self.entries.get(filename)
+        if entry is None or entry[:2] != file_key(filename):
+            return False
+        if entry[2] != 'ok':
+            return not retry_failed
+        return entry[3] is not None and os.path.exists(entry[3])
+
+    def pending(self, filenames, retry_failed=False):
+        """Files that have no entry for their current contents, or whose entry is a failure
+        when retry_failed."""
+        return [filename for filename in filenames if not self.is_done(filename, retry_failed)]
+
+    def record(self, result):
+        size, mtime_ns = result.get('size'), result.get('mtime_ns')
+        if size is None:
+            # Killed and crashed files are recorded by the parent, which never stat'ed them
+            try:
+                size, mtime_ns = file_key(result['input'])
+            except OSError:
+                pass
+        self.conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                          (result['input'], size, mtime_ns, result['status'], result['output'],
+                           result['error'], result.get('seconds'), result.get('stage'),
+                           result.get('stage_seconds'), time.time()))
+        self.entries[result['input']] = (size, mtime_ns, result['status'], result['output'])
+        self.uncommitted = self.uncommitted + 1
+        if self.uncommitted >= self.commit_every:
+            self.commit()
+
+    def status_counts(self):
+        counts = {}
+        for entry in self.entries.values():
+            counts[entry[2]] = counts.get(entry[2], 0) + 1
+        return counts
+
+    def commit(self):
+        self.conn.commit()
+        self.uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
@@ -0,0 +1,205 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from OCC.Core.BRep import BRep_Tool
+from OCC.Core.BRepMesh import BRepMesh_IncrementalMesh
+from OCC.Core.BRepTools import breptools_Clean
+from OCC.Core.Bnd import Bnd_Box
+from OCC.Core.BRepBndLib import brepbndlib_Add
+from OCC.Core.OSD import OSD_Parallel, OSD_ThreadPool
+from OCC.Core.TopAbs import TopAbs_REVERSED
+from OCC.Core.TopLoc import TopLoc_Location
+from OCC.Extend.TopologyUtils import TopologyExplorer
+
+from occ_numpy import array1_of_pnt, array1_of_triangle, trsf_matrix
+
+# Tessellation parameters accepted by triangulate_shape / Solid.parse_shape(mesh_params=...):
+#   linear_deflection   maximum chordal deviation, in model units
+#   angular_deflection  maximum angle between adjacent triangle normals, in radians
+#   relative            OCC relative mode: linear_deflection is a fraction of each edge's size
+#   bbox_fraction       if set, linear_deflection = bbox_fraction * bounding box diagonal of the
+#                       shape, so the triangle count no longer depends on the part's scale
+#   parallel            let BRepMesh mesh faces on several threads
+DEFAULT_MESH_PARAMS = {
+    'linear_deflection': 0.3,
+    'angular_deflection': 0.5,
+    'relative': False,
+    'bbox_fraction': None,
+    'parallel': True,
+}
+
+# Resolved parameters of the last mesh applied to recently meshed shapes, by shape hash. BRepMesh
+# keeps a triangulation that is already finer than requested, so a shape is cleaned before it is
+# meshed with other parameters (or when nothing is known about it). Bounded, since a batch worker
+# meshes shapes from many files.
+_MESHED_WITH = OrderedDict()
+_MESHED_WITH_SIZE = 4096
+
+# Set by set_mesh_threads, so pools started from this process can apply the same bound
+_mesh_threads = None
+
+
+def set_mesh_threads(n_threads):
+    """Bound the number of threads parallel BRepMesh may use in this process.
+
+    Parallel meshing runs on OCC's default thread pool, which otherwise starts one thread
+    per core; several batch workers each doing that would oversubscribe the machine.
+    """
+    global _mesh_threads
+    _mesh_threads = n_threads
+    OSD_Parallel.SetUseOcctThreads(True)
+    OSD_ThreadPool.DefaultPool(n_threads).Init(n_threads)
+
+
+def mesh_threads():
+    """The bound given to set_mesh_threads in this process, or None if it was never called."""
+    return _mesh_threads
+
+
+def bounding_box_diagonal(shape):
+    bbox = Bnd_Box()
+    brepbndlib_Add(shape, bbox)
+    if bbox.IsVoid():
+        return 0.0
+    xmin, ymin, zmin, xmax, ymax, zmax = bbox.Get()
+    return float(np.linalg.norm([xmax - xmin, ymax - ymin, zmax - zmin]))
+
+
+def resolve_mesh_params(shape, mesh_params=None):
+    """Fill in defaults and turn a bbox_fraction into an absolute linear deflection for this shape."""
+    unknown = set(mesh_params or {}) - set(DEFAULT_MESH_PARAMS)
+    if unknown:
+        raise ValueError("Unknown mesh parameters: %s" % ", ".join(sorted(unknown)))
+    params = dict(DEFAULT_MESH_PARAMS, **(mesh_params or {}))
+    if params['bbox_fraction']:
+        diagonal = bounding_box_diagonal(shape)
+        if diagonal > 0:
+            params['linear_deflection'] = params['bbox_fraction'] * diagonal
+            params['relative'] = False
+    return params
+
+
+def _mesh_key(params):
+    return params['linear_deflection'], params['angular_deflection'], params['relative']
+
+
+def _clean_if_meshed_otherwise(shape, params):
+    if _MESHED_WITH.get(hash(shape)) != _mesh_key(params):
+        breptools_Clean(shape)
+
+
+def _remember_params(shapes, params):
+    for shape in shapes:
+        _MESHED_WITH.pop(hash(shape), None)
+        _MESHED_WITH[hash(shape)] = _mesh_key(params)
+    while len(_MESHED_WITH) > _MESHED_WITH_SIZE:
+        _MESHED_WITH.popitem(last=False)
+
+
+def mesh_shape(shape, linear_deflection=0.3, is_relative=False, angular_deflection=0.5, in_parallel=False):
+    mesh = BRepMesh_IncrementalMesh(shape, linear_deflection, is_relative, angular_deflection, in_parallel)
+    mesh.Perform()
+    return mesh
+
+
+def face_triangulation(face):
+    """(vertices, triangles) of an already meshed face in model coordinates, or None if it has no mesh.
+
+    The face location is applied to the nodes, and triangle winding is flipped for
+    reversed faces so every triangle's normal points out of the solid.
+    """
+    location = TopLoc_Location()
+    triangulation = BRep_Tool().Triangulation(face, location)
+    if triangulation is None:
+        return None
+    vertices = array1_of_pnt(triangulation.Nodes())
+    triangles = array1_of_triangle(triangulation.Triangles())
+    if not location.IsIdentity():
+        m = trsf_matrix(location.Transformation())
+        vertices = vertices @ m[:, :3].T + m[:, 3]
+    if face.Orientation() == TopAbs_REVERSED:
+        triangles = triangles[:, [0, 2, 1]]
+    return vertices, triangles
+
+
+def collect_triangulation(shape):
+    """Merge the triangulations of all faces of an already meshed shape into one buffer.
+
+    Returns a dict with
+        vertices               (n, 3) float64
+        triangles              (m, 3) int32 indices into vertices
+        face_vertex_offsets    (n_faces + 1,) vertices of face i are [off[i], off[i+1])
+        face_triangle_offsets  (n_faces + 1,) same for triangles
+    Faces are in TopologyExplorer order, i.e. face i here is face_id i + 1. Faces without
+    a triangulation get an empty range.
+    """
+    vertices, triangles = [], []
+    vertex_offsets, triangle_offsets = [0], [0]
+    for face in TopologyExplorer(shape).faces():
+        face_mesh = face_triangulation(face)
+        if face_mesh is not None:
+            vertices.append(face_mesh[0])
+            triangles.append(face_mesh[1] + vertex_offsets[-1])
+            vertex_offsets.append(vertex_offsets[-1] + len(face_mesh[0]))
+            triangle_offsets.append(triangle_offsets[-1] + len(face_mesh[1]))
+        else:
+            vertex_offsets.append(vertex_offsets[-1])
+            triangle_offsets.append(triangle_offsets[-1])
+
+    return {
+        'vertices': np.concatenate(vertices) if vertices else np.zeros((0, 3)),
+        'triangles': np.concatenate(triangles).astype(np.int32) if triangles else np.zeros((0, 3), dtype=np.int32),
+        'face_vertex_offsets': np.array(vertex_offsets, dtype=np.int64),
+        'face_triangle_offsets': np.array(triangle_offsets, dtype=np.int64),
+    }
+
+
+def triangulate_shape(shape, mesh_params=None):
+    """Mesh shape with mesh_params (see DEFAULT_MESH_PARAMS) and return its merged triangulation.
+
+    The resolved parameters are stored under 'params' so the output records how it was meshed.
+    An existing triangulation made with other parameters is cleared first.
+    """
+    params = resolve_mesh_params(shape, mesh_params)
+    _clean_if_meshed_otherwise(shape, params)
+    mesh_shape(shape, params['linear_deflection'], params['relative'], params['angular_deflection'],
+               params['parallel'])
+    _remember_params([shape], params)
+    triangulation = collect_triangulation(shape)
+    triangulation['params'] = params
+    return triangulation
+
+
+def triangulate_parts(shape, parts, mesh_params=None):
+    """Mesh shape once, in parallel, and return the triangulation of each sub-shape in parts.
+
+    Used to mesh a whole compound in one BRepMesh pass and slice out its solids, which keeps
+    every thread busy instead of meshing the solids one after another.
+
+    A bbox_fraction is relative to each part's own bounding box, as when the parts are meshed
+    alone. A BRepMesh pass has a single deflection, so the parts are then meshed one by one
+    (each on parallel threads) instead of in one pass.
+    """
+    if mesh_params and mesh_params.get('bbox_fraction'):
+        return [triangulate_shape(part, dict(mesh_params, parallel=True)) for part in parts]
+    params = resolve_mesh_params(shape, mesh_params)
+    params['parallel'] = True
+    _clean_if_meshed_otherwise(shape, params)
+    mesh_shape(shape, params['linear_deflection'], params['relative'], params['angular_deflection'], True)
+    _remember_params([shape] + list(parts), params)
+    triangulations = []
+    for part in parts:
+        triangulation = collect_triangulation(part)
+        triangulation['params'] = params
+        triangulations.append(triangulation)
+    return triangulations
+
+
+def triangulate_lods(shape, levels):
+    """One triangulation per entry of levels (a list of mesh_params dicts), in the same order.
+
+    triangulate_shape clears the mesh of the previous level, which BRepMesh would otherwise
+    keep when it is finer than the next one.
+    """
+    return [triangulate_shape(shape, mesh_params) for mesh_params in levels]
@@ -0,0 +1,80 @@
+import itertools
+
+import numpy as np
+
+from OCC.Core.TColStd import TColStd_Array1OfReal, TColStd_Array1OfInteger
+
+
+def array1_of_real(arr):
+    """TColStd_Array1OfReal -> 1-D float64 array."""
+    return np.fromiter((arr.Value(i) for i in range(arr.Lower(), arr.Upper() + 1)),
+                       dtype=np.float64, count=arr.Length())
+
+
+def array1_of_int(arr):
+    """TColStd_Array1OfInteger -> 1-D int64 array."""
+    return np.fromiter((arr.Value(i) for i in range(arr.Lower(), arr.Upper() + 1)),
+                       dtype=np.int64, count=arr.Length())
+
+
+def array2_of_real(arr):
+    """TColStd_Array2OfReal -> (rows, cols) float64 array."""
+    rows, cols = arr.ColLength(), arr.RowLength()
+    values = (arr.Value(i, j)
+              for i in range(arr.LowerRow(), arr.UpperRow() + 1)
+              for j in range(arr.LowerCol(), arr.UpperCol() + 1))
+    return np.fromiter(values, dtype=np.float64, count=rows * cols).reshape(rows, cols)
+
+
+def array1_of_pnt(arr, dim=3):
+    """TColgp_Array1OfPnt / TColgp_Array1OfPnt2d -> (n, dim) float64 array."""
+    coords = itertools.chain.from_iterable(arr.Value(i).Coord() for i in range(arr.Lower(), arr.Upper() + 1))
+    return np.fromiter(coords, dtype=np.float64, count=arr.Length() * dim).reshape(-1, dim)
+
+
+def array2_of_pnt(arr):
+    """TColgp_Array2OfPnt -> (rows, cols, 3) float64 array."""
+    rows, cols = arr.ColLength(), arr.RowLength()
+    coords = itertools.chain.from_iterable(arr.Value(i, j).Coord()
+                                           for i in range(arr.LowerRow(), arr.UpperRow() + 1)
+                                           for j in range(arr.LowerCol(), arr.UpperCol() + 1))
+    return np.fromiter(coords, dtype=np.float64, count=rows * cols * 3).reshape(rows, cols, 3)
+
+
+def knot_sequence(knots, multiplicities):
+    """Expand distinct knots and their multiplicities into the flat knot vector."""
+    return np.repeat(knots, multiplicities)
+
+
+def curve_knot_vector(bspline_curve):
+    """Knot vector of a Geom(2d)_BSplineCurve from its distinct knots, one SWIG call per distinct knot."""
+    n = bspline_curve.NbKnots()
+    k = TColStd_Array1OfReal(1, n)
+    m = TColStd_Array1OfInteger(1, n)
+    bspline_curve.Knots(k)
+    bspline_curve.Multiplicities(m)
+    return knot_sequence(array1_of_real(k), array1_of_int(m))
+
+
+def surface_knot_vectors(bspline_surface):
+    """(u, v) knot vectors of a Geom_BSplineSurface from its distinct knots."""
+    nu, nv = bspline_surface.NbUKnots(), bspline_surface.NbVKnots()
+    ku, mu = TColStd_Array1OfReal(1, nu), TColStd_Array1OfInteger(1, nu)
+    kv, mv = TColStd_Array1OfReal(1, nv), TColStd_Array1OfInteger(1, nv)
+    bspline_surface.UKnots(ku)
+    bspline_surface.UMultiplicities(mu)
+    bspline_surface.VKnots(kv)
+    bspline_surface.VMultiplicities(mv)
+    return (knot_sequence(array1_of_real(ku), array1_of_int(mu)),
+            knot_sequence(array1_of_real(kv), array1_of_int(mv)))
+
+
+def array1_of_triangle(arr):
+    """Poly_Array1OfTriangle -> (n, 3) int32 array of zero-based node indices."""
+    indices = itertools.chain.from_iterable(arr.Value(i).Get() for i in range(arr.Lower(), arr.Upper() + 1))
+    return np.fromiter(indices, dtype=np.int32, count=arr.Length() * 3).reshape(-1, 3) - 1
+
+
+def trsf_matrix(trsf):
+    """gp_Trsf -> (3, 4) float64 matrix [R | t]."""
+    return np.array([[trsf.Value(r, c) for c in range(1, 5)] for r in range(1, 4)])
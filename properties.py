@@ -0,0 +1,85 @@
+import numpy as np
+
+from OCC.Core.Bnd import Bnd_Box, Bnd_OBB
+from OCC.Core.BRepBndLib import brepbndlib_Add, brepbndlib_AddOptimal, brepbndlib_AddOBB
+from OCC.Core.GProp import GProp_GProps
+from OCC.Core.BRepGProp import brepgprop_SurfaceProperties, brepgprop_VolumeProperties
+
+
+def bounding_box(shape, optimal=False):
+    """Axis-aligned box as float64 [xmin, ymin, zmin, xmax, ymax, zmax, dx, dy, dz] (NaN if empty).
+
+    optimal computes a tight box from the geometry instead of padding it with the
+    shape's tolerances and control points (slower).
+    """
+    bbox = Bnd_Box()
+    if optimal:
+        brepbndlib_AddOptimal(shape, bbox, True, False)
+    else:
+        brepbndlib_Add(shape, bbox)
+    if bbox.IsVoid():
+        return np.full(9, np.nan)
+    corners = np.array(bbox.Get(), dtype=np.float64)
+    return np.concatenate([corners, corners[3:] - corners[:3]])
+
+
+def _xyz(xyz):
+    return [xyz.X(), xyz.Y(), xyz.Z()]
+
+
+def oriented_bounding_box(shape, optimal=True):
+    """Oriented box: {'center': (3,), 'axes': (3, 3) one direction per row, 'half_sizes': (3,)}."""
+    obb = Bnd_OBB()
+    brepbndlib_AddOBB(shape, obb, True, optimal, False)
+    return {'center': np.array(_xyz(obb.Center())),
+            'axes': np.array([_xyz(obb.XDirection()), _xyz(obb.YDirection()), _xyz(obb.ZDirection())]),
+            'half_sizes': np.array([obb.XHSize(), obb.YHSize(), obb.ZHSize()])}
+
+
+def face_area(face):
+    props = GProp_GProps()
+    brepgprop_SurfaceProperties(face, props)
+    return props.Mass()
+
+
+def volume_properties(shape):
+    """(volume, centroid as a (3,) array) of a solid."""
+    props = GProp_GProps()
+    brepgprop_VolumeProperties(shape, props)
+    return props.Mass(), np.array(props.CentreOfMass().Coord())
+
+
+# Face kinds as the surface handlers name them; the face table stores each face's index here
+FACE_KINDS = ['Plane', 'Cylinder', 'Cone', 'Sphere', 'Torus', 'Bspline Surface', 'Bezier Surface',
+              'Surface of Revolution', 'Surface of Extrusion', 'Offset Surface']
+_KIND_CODES = {kind: code for code, kind in enumerate(FACE_KINDS)}
+
+
+class FaceTable:
+    """Per-solid table of face properties, one row per extracted face, as NumPy columns.
+
+    Rows are appended while the faces are extracted and fill() turns them into arrays
+    in the dict the solid's config refers to, so size or area filters over a dataset
+    work on whole columns instead of walking the face dicts. 'kind' holds int8 codes
+    into 'kinds' (FACE_KINDS, -1 for any other kind), so it is a numeric column too.
+    """
+
+    def __init__(self):
+        self.face_ids = []
+        self.kinds = []
+        self.areas = []
+        self.bounding_boxes = []
+
+    def add(self, face_id, kind, area, bounding_box):
+        self.face_ids.append(face_id)
+        self.kinds.append(kind)
+        self.areas.append(area)
+        self.bounding_boxes.append(bounding_box[:6])
+
+    def fill(self, table):
+        table['face_id'] = np.array(self.face_ids, dtype=np.int32)
+        table['kind'] = np.array([_KIND_CODES.get(kind, -1) for kind in self.kinds], dtype=np.int8)
+        table['kinds'] = list(FACE_KINDS)
+        table['area'] = np.array(self.areas, dtype=np.float64)
+        table['bounding_box'] = np.array(self.bounding_boxes, dtype=np.float64).reshape(-1, 6)
+        return table
@@ -0,0 +1,454 @@
+"""Sample points and normals on the faces of a parsed model with NumPy, without OCC.
+
+Surfaces are evaluated from what the parser extracted: B-spline and Bezier faces
+from their knots, poles and weights (de Boor basis functions evaluated for a whole
+parameter grid at once), planes, cylinders, cones, spheres and tori from their
+parameters. Each face is sampled on a regular grid over its 'uv_bounds' and the
+samples outside its trim loops are dropped.
+
+    python sampling.py model.json samples.npz --grid 64
+"""
+import argparse
+
+import numpy as np
+
+from versions import solid_configs
+from writers import read_output
+
+# Default trim discretization tolerance, as a fraction of the diagonal of a face's parameter range
+TRIM_TOLERANCE = 1e-3
+
+
+def find_spans(knots, degree, params):
+    """Index of the knot span holding each parameter (the last non-empty span for the end of the range)."""
+    last = len(knots) - degree - 2
+    spans = np.searchsorted(knots, params, side='right') - 1
+    return np.clip(spans, degree, last)
+
+
+def _ratio(numerator, denominator):
+    # Terms of the basis recurrences with a zero-length knot interval are zero
+    safe = np.where(denominator == 0.0, 1.0, denominator)
+    return np.where(denominator == 0.0, 0.0, numerator / safe)
+
+
+def basis_functions(knots, degree, params):
+    """(spans, N, dN) of a knot vector at every parameter.
+
+    N[i, k] and dN[i, k] are the value and first derivative of the k-th non-zero basis
+    function at params[i], i.e. of basis function spans[i] - degree + k. The recurrence
+    runs once per degree for all parameters together.
+    """
+    knots = np.asarray(knots, dtype=np.float64)
+    params = np.asarray(params, dtype=np.float64)
+    spans = find_spans(knots, degree, params)
+    n = len(params)
+    left = np.zeros((n, degree + 1))
+    right = np.zeros((n, degree + 1))
+    N = np.zeros((n, degree + 1))
+    N[:, 0] = 1.0
+    lower = N[:, :1].copy()
+    for j in range(1, degree + 1):
+        left[:, j] = params - knots[spans + 1 - j]
+        right[:, j] = knots[spans + j] - params
+        saved = np.zeros(n)
+        for r in range(j):
+            temp = _ratio(N[:, r], right[:, r + 1] + left[:, j - r])
+            N[:, r] = saved + right[:, r + 1] * temp
+            saved = left[:, j - r] * temp
+        N[:, j] = saved
+        if j == degree - 1:
+            lower = N[:, :degree].copy()
+
+    dN = np.zeros((n, degree + 1))
+    if degree > 0:
+        # N'_i,p = p (N_i,p-1 / (u_i+p - u_i) - N_i+1,p-1 / (u_i+p+1 - u_i+1)), with the degree
+        # p - 1 functions of the span (lower) being N_spans-p+1 .. N_spans
+        for k in range(degree + 1):
+            i = spans - degree + k
+            if k > 0:
+                dN[:, k] += _ratio(degree * lower[:, k - 1], knots[i + degree] - knots[i])
+            if k < degree:
+                dN[:, k] -= _ratio(degree * lower[:, k], knots[i + degree + 1] - knots[i + 1])
+    return spans, N, dN
+
+
+def _homogeneous(points, weights):
+    points = np.asarray(points, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)[..., None]
+    return np.concatenate([points * weights, weights], axis=-1)
+
+
+def evaluate_bspline_curve(curve, params):
+    """(n, dim) points of an extracted B-spline curve (2D pcurve or 3D) at params."""
+    degree = curve['degree']
+    control_points = curve['control_points']
+    Pw = _homogeneous(control_points['points'], control_points['weights'])
+    spans, N, _ = basis_functions(curve['knotvector'], degree, params)
+    indices = spans[:, None] - degree + np.arange(degree + 1)
+    A = np.einsum('ik,ikc->ic', N, Pw[indices])
+    return A[:, :-1] / A[:, -1:]
+
+
+def evaluate_bspline_surface(face, u, v):
+    """(S, Su, Sv) of an extracted B-spline or Bezier surface on the grid u x v, each (len(u), len(v), 3)."""
+    p, q = face['degree_u'], face['degree_v']
+    control_points = face['control_points']
+    Pw = _homogeneous(control_points['points'], control_points['weights'])
+    span_u, Nu, dNu = basis_functions(face['knotvector_u'], p, u)
+    span_v, Nv, dNv = basis_functions(face['knotvector_v'], q, v)
+    iu = span_u[:, None] - p + np.arange(p + 1)
+    iv = span_v[:, None] - q + np.arange(q + 1)
+    # Contract one direction at a time: along u first, giving one row of v poles per u value,
+    # (len(u), n_v, 4), then gather the q + 1 of those under each v value and contract along v
+    Q = np.einsum('ik,ikjc->ijc', Nu, Pw[iu])
+    Qu = np.einsum('ik,ikjc->ijc', dNu, Pw[iu])
+    A = np.einsum('jl,ijlc->ijc', Nv, Q[:, iv])
+    Au = np.einsum('jl,ijlc->ijc', Nv, Qu[:, iv])
+    Av = np.einsum('jl,ijlc->ijc', dNv, Q[:, iv])
+    w = A[..., 3:]
+    S = A[..., :3] / w
+    Su = (Au[..., :3] - Au[..., 3:] * S) / w
+    Sv = (Av[..., :3] - Av[..., 3:] * S) / w
+    return S, Su, Sv
+
+
+def _frame(face):
+    location = np.asarray(face['location'], dtype=np.float64)
+    x_axis = np.asarray(face['x_axis'], dtype=np.float64)
+    y_axis = np.asarray(face['y_axis'], dtype=np.float64)
+    z_axis = np.asarray(face['z_axis'], dtype=np.float64)
+    return location, x_axis, y_axis, z_axis
+
+
+def evaluate_primitive_surface(face, u, v):
+    """(S, Su, Sv) of an extracted plane, cylinder, cone, sphere or torus on the grid u x v.
+
+    The parametrizations are OCC's (gp_Pln, gp_Cylinder, gp_Cone, gp_Sphere, gp_Torus).
+    """
+    U, V = np.meshgrid(np.asarray(u, dtype=np.float64), np.asarray(v, dtype=np.float64), indexing='ij')
+    U, V = U[..., None], V[..., None]
+    location, x_axis, y_axis, z_axis = _frame(face)
+    kind = face['kind']
+    if kind == 'Plane':
+        S = location + U * x_axis + V * y_axis
+        return S, np.broadcast_to(x_axis, S.shape), np.broadcast_to(y_axis, S.shape)
+
+    radial = np.cos(U) * x_axis + np.sin(U) * y_axis
+    d_radial = -np.sin(U) * x_axis + np.cos(U) * y_axis
+    if kind == 'Cylinder':
+        radius = face['radius']
+        S = location + radius * radial + V * z_axis
+        return S, radius * d_radial, np.broadcast_to(z_axis, S.shape)
+    if kind == 'Cone':
+        radius, angle = face['radius'], face['angle']
+        r = radius + V * np.sin(angle)
+        S = location + r * radial + V * np.cos(angle) * z_axis
+        return S, r * d_radial, np.sin(angle) * radial + np.cos(angle) * z_axis
+    if kind == 'Sphere':
+        radius = face['radius']
+        S = location + radius * np.cos(V) * radial + radius * np.sin(V) * z_axis
+        return S, radius * np.cos(V) * d_radial, -radius * np.sin(V) * radial + radius * np.cos(V) * z_axis
+    if kind == 'Torus':
+        major, minor = face['max_radius'], face['min_radius']
+        r = major + minor * np.cos(V)
+        S = location + r * radial + minor * np.sin(V) * z_axis
+        return S, r * d_radial, -minor * np.sin(V) * radial + minor * np.cos(V) * z_axis
+    raise ValueError("Cannot evaluate surfaces of kind %r" % kind)
+
+
+# face 'kind' -> evaluator(face, u, v) returning (S, Su, Sv) on the grid
+EVALUATORS = {
+    'Bspline Surface': evaluate_bspline_surface,
+    'Bezier Surface': evaluate_bspline_surface,
+    'Plane': evaluate_primitive_surface,
+    'Cylinder': evaluate_primitive_surface,
+    'Cone': evaluate_primitive_surface,
+    'Sphere': evaluate_primitive_surface,
+    'Torus': evaluate_primitive_surface,
+}
+
+
+def normals(Su, Sv, reversed=False):
+    """Unit normals Su x Sv (flipped for reversed faces); zero where the surface is degenerate."""
+    n = np.cross(Su, Sv)
+    length = np.linalg.norm(n, axis=-1, keepdims=True)
+    n = np.divide(n, length, out=np.zeros_like(n), where=length > 1e-12)
+    return -n if reversed else n
+
+
+def face_surface(face_config):
+    """The surface dict (with 'uv_bounds' and 'trims') of a face config, however its handler nests it."""
+    return face_config['shape']['data']
+
+
+def face_trims(surface):
+    if 'control_points' in surface and 'trims' in surface['control_points']:
+        return surface['control_points']['trims']
+    return surface.get('trims')
+
+
+def evaluate_curve(curve, params):
+    """(n, dim) points of an extracted trim or edge curve at params."""
+    curve_type = curve['type']
+    if curve_type == 'spline':
+        return evaluate_bspline_curve(curve, params)
+    t = np.asarray(params, dtype=np.float64)[:, None]
+    data = curve['data']
+    location = np.asarray(data['location'], dtype=np.float64)
+    if curve_type == 'line':
+        return location + t * np.asarray(data['direction'], dtype=np.float64)
+    x_axis = np.asarray(data['x_axis'], dtype=np.float64)
+    y_axis = np.asarray(data['y_axis'], dtype=np.float64)
+    if curve_type == 'circle':
+        return location + data['radius'] * (np.cos(t) * x_axis + np.sin(t) * y_axis)
+    if curve_type == 'ellipse':
+        return location + data['major_radius'] * np.cos(t) * x_axis + data['minor_radius'] * np.sin(t) * y_axis
+    raise ValueError("Cannot evaluate curves of type %r" % curve_type)
+
+
+def _segment_distances(points, a, b):
+    """Distance of every points[i] to the segment a[i]-b[i]."""
+    ab = b - a
+    length2 = np.einsum('ij,ij->i', ab, ab)
+    t = np.clip(_ratio(np.einsum('ij,ij->i', points - a, ab), length2), 0.0, 1.0)
+    return np.linalg.norm(points - (a + t[:, None] * ab), axis=1)
+
+
+def _initial_params(curve, first, last, tolerance):
+    if curve['type'] == 'circle' or curve['type'] == 'ellipse':
+        # Chord sagitta r (1 - cos(step / 2)) <= tolerance, with the larger radius for ellipses
+        data = curve['data']
+        radius = data['radius'] if curve['type'] == 'circle' else data['major_radius']
+        step = 2 * np.arccos(max(1.0 - tolerance / radius, -1.0)) if radius > tolerance else np.pi / 2
+        return np.linspace(first, last, max(int(np.ceil(abs(last - first) / step)), 2) + 1)
+    # Splines: every knot span inside the interval, split in degree pieces
+    knots = np.unique(np.asarray(curve['knotvector'], dtype=np.float64))
+    breaks = np.unique(np.concatenate([[first, last], knots[(knots > min(first, last)) & (knots < max(first, last))]]))
+    pieces = max(curve['degree'], 2)
+    params = [np.linspace(b0, b1, pieces + 1)[:-1] for b0, b1 in zip(breaks[:-1], breaks[1:])]
+    params = np.concatenate(params + [[breaks[-1]]])
+    return params if first <= last else params[::-1]
+
+
+def discretize_curve(curve, tolerance, max_depth=12):
+    """(n, dim) polyline of an extracted curve over its 'interval', within tolerance of the curve.
+
+    Lines are their two end points and circles get the number of chords their radius
+    needs. Ellipses and splines start from the knot spans and are refined where the
+    curve at the middle of a chord is further than tolerance from it, all chords of
+    the curve at once per round.
+    """
+    first, last = curve['interval']
+    if curve['type'] == 'line':
+        return evaluate_curve(curve, np.array([first, last]))
+    params = _initial_params(curve, first, last, tolerance)
+    points = evaluate_curve(curve, params)
+    if curve['type'] == 'circle':
+        return points
+    for _ in range(max_depth):
+        middle = (params[:-1] + params[1:]) / 2
+        off = _segment_distances(evaluate_curve(curve, middle), points[:-1], points[1:]) > tolerance
+        if not off.any():
+            break
+        params = np.insert(params, np.nonzero(off)[0] + 1, middle[off])
+        points = evaluate_curve(curve, params)
+    return points
+
+
+def trim_curves(trims):
+    """Yield (loop index, pcurve) for every trim curve of a face that can be evaluated."""
+    for n_loop, loop in enumerate(trims['data']):
+        for trim in loop:
+            # Shared-edge trims wrap the pcurve next to the edge id
+            curve = trim.get('pcurve', trim)
+            if curve.get('interval') is not None and curve['type'] in ('spline', 'line', 'circle', 'ellipse'):
+                yield n_loop, curve
+
+
+def trim_segments(trims, tolerance):
+    """(n, 2, 2) UV segments of all trim loops of a face, every pcurve discretized within tolerance.
+
+    The curves are kept apart rather than chained into loops: the crossing test of
+    inside_trims does not need the order, and leaving the seams of periodic faces out
+    of the loops keeps it right (see inside_trims).
+    """
+    segments = []
+    for _, curve in trim_curves(trims):
+        polyline = discretize_curve(curve, tolerance)
+        segments.append(np.stack([polyline[:-1], polyline[1:]], axis=1))
+    if not segments:
+        return np.zeros((0, 2, 2))
+    return np.concatenate(segments)
+
+
+def _segment_pairs(lo, hi, order, max_pairs):
+    """Yield (segment, sample) index arrays pairing every segment s with the samples
+    order[lo[s]:hi[s]], about max_pairs pairs at a time."""
+    counts = hi - lo
+    cumulative = np.cumsum(counts)
+    splits = np.searchsorted(cumulative, np.arange(max_pairs, cumulative[-1], max_pairs), side='right')
+    for chunk in np.split(np.arange(len(lo)), splits):
+        chunk = chunk[counts[chunk] > 0]
+        if not len(chunk):
+            continue
+        chunk_counts = counts[chunk]
+        segment = np.repeat(chunk, chunk_counts)
+        # Position of every pair within its segment's range of samples
+        offsets = np.arange(len(segment)) - np.repeat(np.cumsum(chunk_counts) - chunk_counts, chunk_counts)
+        yield segment, order[np.repeat(lo[chunk], chunk_counts) + offsets]
+
+
+def inside_trims(segments, uv, tolerance=0.0, max_pairs=1 << 24):
+    """Boolean mask of the (n, 2) uv samples inside the trim segments, by counting crossings.
+
+    The ray from every sample goes towards +v, so segments along v (such as the seams
+    left out of the loops of periodic faces) never change the count. With the samples
+    sorted by u, each segment finds the samples under it by binary search, and the
+    (segment, sample) pairs of all segments are tested in a few array operations,
+    at most max_pairs at a time: the work grows with the number of samples times the
+    number of boundary crossings along a line of constant u, not with all segments.
+
+    The crossing test puts samples on the boundary itself on either side (all of a
+    rectangle's u_max and v_max edges fall outside), so with a tolerance the samples
+    within it of a segment count as inside (see near_segments).
+    """
+    uv = np.asarray(uv, dtype=np.float64)
+    n = len(uv)
+    parity = np.zeros(n, dtype=np.int64)
+    if n == 0 or len(segments) == 0:
+        return parity.astype(bool)
+    order = np.argsort(uv[:, 0], kind='stable')
+    u_sorted = uv[order, 0]
+    a, b = segments[:, 0], segments[:, 1]
+    u_low, u_high = np.minimum(a[:, 0], b[:, 0]), np.maximum(a[:, 0], b[:, 0])
+    # (u0 <= u) != (u1 <= u) is min(u0, u1) <= u < max(u0, u1): a half-open range of the sorted samples
+    lo = np.searchsorted(u_sorted, u_low, side='left')
+    hi = np.searchsorted(u_sorted, u_high, side='left')
+    slopes = _ratio(b[:, 1] - a[:, 1], b[:, 0] - a[:, 0])
+    for segment, sample in _segment_pairs(lo, hi, order, max_pairs):
+        v_cross = a[segment, 1] + (uv[sample, 0] - a[segment, 0]) * slopes[segment]
+        parity += np.bincount(sample[v_cross > uv[sample, 1]], minlength=n)
+    inside = (parity & 1).astype(bool)
+    if tolerance > 0:
+        outside = np.nonzero(~inside)[0]
+        inside[outside[near_segments(segments, uv[outside], tolerance, max_pairs)]] = True
+    return inside
+
+
+def near_segments(segments, uv, tolerance, max_pairs=1 << 24):
+    """Boolean mask of the (n, 2) uv samples within tolerance of a segment.
+
+    Every segment tests the samples in the band around it along its shorter extent (u
+    or v), found by binary search in the samples sorted along that direction, so the
+    straight edges of a face only meet the samples next to them.
+    """
+    uv = np.asarray(uv, dtype=np.float64)
+    near = np.zeros(len(uv), dtype=bool)
+    a, b = segments[:, 0], segments[:, 1]
+    extent = np.abs(b - a)
+    flat_in_v = extent[:, 1] < extent[:, 0]
+    for axis, chosen in enumerate([np.nonzero(~flat_in_v)[0], np.nonzero(flat_in_v)[0]]):
+        if not len(chosen) or not len(uv):
+            continue
+        order = np.argsort(uv[:, axis], kind='stable')
+        coordinates = uv[order, axis]
+        lo = np.searchsorted(coordinates, np.minimum(a[chosen, axis], b[chosen, axis]) - tolerance, side='left')
+        hi = np.searchsorted(coordinates, np.maximum(a[chosen, axis], b[chosen, axis]) + tolerance, side='right')
+        for segment, sample in _segment_pairs(lo, hi, order, max_pairs):
+            segment = chosen[segment]
+            close = _segment_distances(uv[sample], a[segment], b[segment]) <= tolerance
+            near[sample[close]] = True
+    return near
+
+
+def uv_tolerance(surface, relative=TRIM_TOLERANCE):
+    """Absolute UV tolerance for a face: relative times the diagonal of its parameter range."""
+    u_min, u_max, v_min, v_max = surface['uv_bounds']
+    return relative * np.hypot(u_max - u_min, v_max - v_min)
+
+
+def classify_uv(surface, uv, tolerance=None):
+    """Mask of the (n, 2) uv samples inside the trim loops of a face's surface dict (all True
+    without trims), the samples on the loops included. tolerance is the absolute UV
+    discretization tolerance (see uv_tolerance)."""
+    trims = face_trims(surface)
+    if not trims or not trims['data']:
+        return np.ones(len(uv), dtype=bool)
+    if tolerance is None:
+        tolerance = uv_tolerance(surface)
+    segments = trim_segments(trims, tolerance)
+    if not len(segments):
+        return np.ones(len(uv), dtype=bool)
+    # The polylines are within tolerance of the curves, so are the samples on the boundary
+    return inside_trims(segments, uv, tolerance)
+
+
+def sample_face(face_config, n_u=32, n_v=32, trim=True, tolerance=None):
+    """{'uv', 'points', 'normals'} of a regular n_u x n_v grid over the face's parameter range,
+    keeping only the samples inside its trim loops (discretized within tolerance, see
+    classify_uv); None for surfaces that cannot be evaluated."""
+    surface = face_surface(face_config)
+    evaluator = EVALUATORS.get(surface.get('kind'))
+    if evaluator is None or 'uv_bounds' not in surface:
+        return None
+    u_min, u_max, v_min, v_max = surface['uv_bounds']
+    u = np.linspace(u_min, u_max, n_u)
+    v = np.linspace(v_min, v_max, n_v)
+    S, Su, Sv = evaluator(surface, u, v)
+    uv = np.stack(np.meshgrid(u, v, indexing='ij'), axis=-1).reshape(-1, 2)
+    points = S.reshape(-1, 3)
+    face_normals = normals(Su, Sv, surface.get('reversed', False)).reshape(-1, 3)
+    if trim:
+        keep = classify_uv(surface, uv, tolerance)
+        uv, points, face_normals = uv[keep], points[keep], face_normals[keep]
+    return {'uv': uv, 'points': points, 'normals': face_normals}
+
+
+def sample_model(config, n_u=32, n_v=32, trim=True, tolerance=None):
+    """Yield (solid id, face id, samples) for every face of a parsed model that can be evaluated."""
+    for solid in solid_configs(config):
+        for face_config in solid['data']:
+            samples = sample_face(face_config, n_u, n_v, trim, tolerance)
+            if samples is not None:
+                yield solid.get('solid id'), face_config['shape']['face_id'], samples
+
+
+def write_samples(config, filename, n_u=32, n_v=32, trim=True, tolerance=None):
+    """Sample every face and save the samples of all faces as flat arrays in an .npz, with
+    'offsets' delimiting the rows of each (solid id, face id)."""
+    ids, uv, points, face_normals, offsets = [], [], [], [], [0]
+    for s_id, f_id, samples in sample_model(config, n_u, n_v, trim, tolerance):
+        ids.append((s_id or 0, f_id))
+        uv.append(samples['uv'])
+        points.append(samples['points'])
+        face_normals.append(samples['normals'])
+        offsets.append(offsets[-1] + len(samples['points']))
+    np.savez(filename,
+             ids=np.array(ids, dtype=np.int32).reshape(-1, 2),
+             offsets=np.array(offsets, dtype=np.int64),
+             uv=np.concatenate(uv) if uv else np.zeros((0, 2)),
+             points=np.concatenate(points) if points else np.zeros((0, 3)),
+             normals=np.concatenate(face_normals) if face_normals else np.zeros((0, 3)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample points and normals on the faces of parsed models.")
+    parser.add_argument('input', help="an output of the parser")
+    parser.add_argument('output', help=".npz file of the samples")
+    parser.add_argument('--format', choices=['json', 'jsonl', 'npz'], default=None,
+                        help="format of the input (default: from its extension)")
+    parser.add_argument('--grid', type=int, default=32, help="samples along u and along v on every face")
+    parser.add_argument('--no-trim', action='store_true', help="keep the samples outside the trim loops")
+    parser.add_argument('--trim-tolerance', type=float, default=None,
+                        help="absolute UV tolerance of the trim loop polylines (default: %g of each face's "
+                             "UV diagonal)" % TRIM_TOLERANCE)
+    args = parser.parse_args()
+
+    input_format = args.format or args.input.rsplit('.', 1)[-1]
+    write_samples(read_output(args.input, input_format), args.output, args.grid, args.grid, not args.no_trim,
+                  args.trim_tolerance)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""Index the DATA section of STEP (ISO 10303-21) files without OpenCascade.
+
+The file is memory-mapped and scanned with a regular expression, so counting
+entity types or reading header metadata costs a pass over the bytes instead of
+a read_step_file and a B-rep build.
+"""
+import os
+import re
+import json
+import mmap
+import argparse
+import multiprocessing
+from array import array
+from collections import Counter
+
+STEP_EXTENSIONS = ['.step', '.stp']
+
+# One entity instance: "#id = TYPE(...);" or a complex instance "#id = (A(...) B(...));".
+# Strings may contain ';' (a doubled '' is just two adjacent strings to this pattern).
+# The body is written as runs of other characters separated by strings, which matches in
+# one pass; "(?:[^;']+|'[^']*')*" backtracks exponentially on a statement missing its ';'.
+_ENTITY = re.compile(rb"#(\d+)\s*=\s*(\(|[A-Za-z_][A-Za-z0-9_]*)[^;']*(?:'[^']*'[^;']*)*;")
+_DATA = re.compile(rb"\bDATA\s*(?:\([^;]*\))?\s*;")
+_HEADER_ENTITY = re.compile(rb"\b(FILE_DESCRIPTION|FILE_NAME|FILE_SCHEMA)\s*\(([^;']*(?:'[^']*'[^;']*)*)\)\s*;")
+_TOKEN = re.compile(r"\s*('(?:[^']|'')*'|\.[A-Za-z0-9_]+\.|[A-Za-z_][A-Za-z0-9_]*|#\d+|[-+0-9.Ee]+|[$*(),])")
+
+# STEP surface entities, as the parser names their kinds
+SURFACE_ENTITIES = {
+    'PLANE': 'Plane',
+    'CYLINDRICAL_SURFACE': 'Cylinder',
+    'CONICAL_SURFACE': 'Cone',
+    'SPHERICAL_SURFACE': 'Sphere',
+    'TOROIDAL_SURFACE': 'Torus',
+    'B_SPLINE_SURFACE_WITH_KNOTS': 'Bspline Surface',
+    'BEZIER_SURFACE': 'Bezier Surface',
+    'SURFACE_OF_REVOLUTION': 'Surface of Revolution',
+    'SURFACE_OF_LINEAR_EXTRUSION': 'Surface of Extrusion',
+    'OFFSET_SURFACE': 'Offset Surface',
+}
+
+
+def find_step_files(input_root):
+    """Walk input_root and return every STEP file in it, in a stable order."""
+    step_files = []
+    for dirpath, dirnames, filenames in os.walk(input_root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() in STEP_EXTENSIONS:
+                step_files.append(os.path.join(dirpath, filename))
+    return step_files
+
+
+def data_section_start(buf):
+    """Offset of the DATA keyword in buf (bytes or mmap), or None if there is no DATA section."""
+    data = _DATA.search(buf)
+    return data.start() if data is not None else None
+
+
+def parse_parameters(text):
+    """Parse a Part 21 parameter list ("'a', (1, 2.5), .T., $, #12") into Python values.
+
+    Strings become str, lists become lists, enumerations keep their dots, references
+    stay '#n' strings and $ becomes None.
+    """
+    values, stack = [], []
+    pos = 0
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if m is None:
+            if text[pos:].strip():
+                raise ValueError("Cannot parse STEP parameters at %r" % text[pos:pos + 20])
+            break
+        pos = m.end()
+        token = m.group(1)
+        if token == '(':
+            stack.append(values)
+            values = []
+        elif token == ')':
+            inner, values = values, stack.pop()
+            values.append(inner)
+        elif token == ',':
+            continue
+        elif token == '$':
+            values.append(None)
+        elif token[0] == "'":
+            values.append(token[1:-1].replace("''", "'"))
+        elif token[0] in '-+0123456789':
+            values.append(float(token) if any(c in token for c in '.Ee') else int(token))
+        else:
+            values.append(token)
+    return values
+
+
+def _complex_types(statement):
+    """Partial types of a complex instance, e.g. (BOUNDED_SURFACE, B_SPLINE_SURFACE, ...)."""
+    body = statement[statement.index('=') + 1:]
+    names = []
+    depth = 0
+    for m in re.finditer(r"'(?:[^']|'')*'|[A-Za-z_][A-Za-z0-9_]*|[()]", body):
+        token = m.group(0)
+        if token == '(':
+            depth = depth + 1
+        elif token == ')':
+            depth = depth - 1
+        elif depth == 1 and token[0] != "'":
+            names.append(token)
+    return tuple(names)
+
+
+class StepIndex:
+    """Entity id -> type / byte offset index of one STEP file, plus its header.
+
+    Types are interned: type_codes holds, per entity, an index into types, where
+    each entry is a tuple of type names (one name, or the partial types of a complex
+    instance). The file stays mapped so entity(id) can return the raw statement.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.types = []
+        self.ids = array('q')
+        self.offsets = array('q')
+        self.type_codes = array('i')
+        self._positions = {}
+        with open(filename, 'rb') as f:
+            self.size = os.fstat(f.fileno()).st_size
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+        data = _DATA.search(self.buf)
+        self.data_offset = data.end() if data is not None else 0
+        self.header = self._parse_header(self.buf[:data.start()] if data is not None else b'')
+        self._scan()
+
+    def _parse_header(self, text):
+        header = {}
+        for m in _HEADER_ENTITY.finditer(text):
+            name = m.group(1).decode('ascii')
+            params = parse_parameters(m.group(2).decode('latin-1'))
+            if name == 'FILE_DESCRIPTION' and len(params) >= 2:
+                header['description'] = params[0]
+                header['implementation_level'] = params[1]
+            elif name == 'FILE_NAME':
+                keys = ['name', 'time_stamp', 'author', 'organization', 'preprocessor_version',
+                        'originating_system', 'authorization']
+                header.update(zip(keys, params))
+            elif name == 'FILE_SCHEMA' and params:
+                header['schema'] = params[0]
+        return header
+
+    def _scan(self):
+        codes = {}
+        for m in _ENTITY.finditer(self.buf, self.data_offset):
+            name = m.group(2)
+            if name == b'(':
+                type_names = _complex_types(m.group(0).decode('latin-1'))
+            else:
+                type_names = (name.decode('ascii').upper(),)
+            code = codes.get(type_names)
+            if code is None:
+                code = codes[type_names] = len(self.types)
+                self.types.append(type_names)
+            self._positions[int(m.group(1))] = len(self.ids)
+            self.ids.append(int(m.group(1)))
+            self.offsets.append(m.start())
+            self.type_codes.append(code)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, entity_id):
+        return entity_id in self._positions
+
+    def entity_type(self, entity_id):
+        """Tuple of type names of #entity_id."""
+        return self.types[self.type_codes[self._positions[entity_id]]]
+
+    def offset(self, entity_id):
+        return self.offsets[self._positions[entity_id]]
+
+    def entity(self, entity_id):
+        """The raw text of the "#id = ...;" statement."""
+        start = self.offset(entity_id)
+        return _ENTITY.match(self.buf, start).group(0).decode('latin-1')
+
+    def parameters(self, entity_id):
+        """Parsed parameters of a simple entity instance."""
+        statement = self.entity(entity_id)
+        body = statement[statement.index('=') + 1:].strip()
+        return parse_parameters(body[body.index('('):-1])[0]
+
+    def type_counts(self):
+        """Number of instances of each type; a complex instance counts for each of its partial types."""
+        per_code = Counter(self.type_codes)
+        counts = Counter()
+        for code, n in per_code.items():
+            for name in self.types[code]:
+                counts[name] += n
+        return counts
+
+    def ids_of_type(self, type_name):
+        wanted = {code for code, names in enumerate(self.types) if type_name in names}
+        return [entity_id for entity_id, code in zip(self.ids, self.type_codes) if code in wanted]
+
+    def surface_counts(self):
+        """Surface entities by parser kind. Counts every surface in the file, including ones
+        that only serve as the basis of an offset surface."""
+        counts = self.type_counts()
+        return {kind: counts[name] for name, kind in SURFACE_ENTITIES.items() if counts.get(name)}
+
+    def close(self):
+        if isinstance(self.buf, mmap.mmap):
+            self.buf.close()
+
+
+def index_step_file(filename):
+    return StepIndex(filename)
+
+
+def file_statistics(filename):
+    """Header and entity type counts of one file, as a JSON-serializable record."""
+    record = {'input': filename}
+    try:
+        index = StepIndex(filename)
+    except (OSError, ValueError) as e:
+        record['error'] = repr(e)
+        return record
+    try:
+        record['header'] = index.header
+        record['entities'] = len(index)
+        record['type_counts'] = dict(index.type_counts())
+    finally:
+        index.close()
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count STEP entity types without OpenCascade.")
+    parser.add_argument('paths', nargs='+', help="STEP files or folders to search for them")
+    parser.add_argument('--types', nargs='*', default=None,
+                        help="only report these entity types (default: the surface entities)")
+    parser.add_argument('--all-types', action='store_true', help="report every entity type")
+    parser.add_argument('--jsonl', default=None, help="also write one record per file (header, counts) here")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    filenames = []
+    for path in args.paths:
+        filenames.extend(find_step_files(path) if os.path.isdir(path) else [path])
+
+    totals = Counter()
+    errors = 0
+    out = open(args.jsonl, 'w') if args.jsonl else None
+    with multiprocessing.Pool(args.workers) as pool:
+        for record in pool.imap(file_statistics, filenames, chunksize=16):
+            if 'error' in record:
+                errors = errors + 1
+            else:
+                totals.update(record['type_counts'])
+            if out is not None:
+                out.write(json.dumps(record) + '\n')
+    if out is not None:
+        out.close()
+
+    if args.all_types:
+        names = [name for name, _ in totals.most_common()]
+    else:
+        names = args.types or list(SURFACE_ENTITIES)
+    print("%d files (%d unreadable)" % (len(filenames), errors))
+    for name in names:
+        print("  %s: %d" % (name, totals.get(name, 0)))
+
+
+if __name__ == '__main__':
+    main()
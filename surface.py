@@ -0,0 +1,159 @@
+from OCC.Core.BRepAdaptor import BRepAdaptor_Surface, BRepAdaptor_Curve2d
+from OCC.Core.ShapeAnalysis import ShapeAnalysis_FreeBoundsProperties
+from OCC.Core.TopoDS import topods
+from OCC.Core.TopExp import TopExp_Explorer
+from OCC.Core.TopAbs import TopAbs_EDGE, TopAbs_REVERSED
+
+from NURBS_curve import CurveFactory
+from instrument import stage, count
+from edges import extract_shared_trims
+from properties import bounding_box
+
+TOLERANCE = 1e-6
+
+# GeomAbs surface type -> Surface subclass, filled in by register_surface
+SURFACE_HANDLERS = {}
+
+
+def register_surface(*surf_types):
+    """Class decorator registering a Surface subclass as the handler of the given GeomAbs types."""
+    def register(cls):
+        for surf_type in surf_types:
+            SURFACE_HANDLERS[surf_type] = cls
+        return cls
+    return register
+
+
+class Surface():
+    """Base of the face handlers.
+
+    A handler reads the geometry of its surface type from the face's adaptor in
+    extract_geometry(); extract_data() adds the common header (bounding box, face id)
+    and the trim loops, then lets go of the OCC handles. Handlers are slotted and keep
+    their data only in config; subclasses declare __slots__ too.
+    """
+
+    __slots__ = ('face', 'surf', 'f_id', 'config', 'trimmed', 'edge_registry')
+
+    shape_type = "Surface"
+
+    def __init__(self, face, surf, f_id):
+        self.face = face
+        self.surf = surf
+        self.f_id = f_id
+        self.config = {}
+        self.trimmed = False
+        # Set by the parser to an edges.EdgeRegistry when edges are shared across the solid's faces
+        self.edge_registry = None
+
+    def __repr__(self):
+        return str(self.config)
+
+    def get_bounding_box(self, face, tol=TOLERANCE):
+        return bounding_box(face)
+
+    def extract_geometry(self):
+        raise NotImplementedError
+
+    def extract_surface(self):
+        """extract_geometry() plus what the face adds to its surface: the parameter range
+        [u_min, u_max, v_min, v_max] it covers, and whether its normal is reversed."""
+        face = self.extract_geometry()
+        face['uv_bounds'] = [self.surf.FirstUParameter(), self.surf.LastUParameter(),
+                             self.surf.FirstVParameter(), self.surf.LastVParameter()]
+        face['reversed'] = self.face.Orientation() == TopAbs_REVERSED
+        return face
+
+    def add_trims(self, face, trims):
+        """The geometry dict face with the trim loops added; face itself is left as it is."""
+        return dict(face, trims=trims)
+
+    def split_trims(self, face):
+        """(geometry, trims) of a face's 'data' written by add_trims."""
+        geometry = dict(face)
+        return geometry, geometry.pop('trims', None)
+
+    def extract_header(self):
+        header = {}
+        header['type'] = self.shape_type
+        header['bounding_box'] = self.get_bounding_box(self.face)
+        header['face_id'] = self.f_id
+        return header
+
+    def extract_data(self):
+        self.config['shape'] = self.extract_header()
+        with stage('extract_geometry'):
+            face = self.extract_surface()
+        self.config['shape']['data'] = self.add_trims(face, self.extract_trims_curves())
+        self.release()
+
+    def release(self):
+        """Drop the OCC face and adaptor once everything has been extracted from them."""
+        self.face = None
+        self.surf = None
+        self.edge_registry = None
+
+    def extract_trims_curves(self):
+        with stage('extract_trims_curves'):
+            if self.edge_registry is not None:
+                return extract_shared_trims(self, self.edge_registry)
+            return self.extract_free_bound_trims()
+
+    def extract_free_bound_trims(self):
+        # Read in the Trim Curves
+        trim_curves = []
+        trims = ShapeAnalysis_FreeBoundsProperties(self.face)
+        trims.Perform()
+        num_loops = trims.NbClosedFreeBounds()
+
+        num_open_loops = trims.NbOpenFreeBounds()
+        if num_open_loops > 0:
+            print('Warning: Face has open boundaries')
+
+        for n_boundary in range(num_loops):
+            boundary_data = trims.ClosedFreeBound(n_boundary + 1)
+            boundary_wire = boundary_data.FreeBound()
+            loop = []
+            c_id = 1
+            top_ex = TopExp_Explorer(boundary_wire, TopAbs_EDGE)
+            while (top_ex.More()):
+                edge = topods.Edge(top_ex.Current())
+                curve_adapter = BRepAdaptor_Curve2d(edge, self.face)
+
+                curve_factory = CurveFactory()
+                c = curve_factory.create_curve_object(curve_adapter, self.face, self.surf, c_id)
+                c_id = c_id + 1
+                top_ex.Next()
+                if c is None:
+                    # Unsupported pcurve type (e.g. hyperbola, offset curve)
+                    continue
+                loop.append(c.extract_curve_data(self.f_id))
+            count('trim_curves', len(loop))
+            trim_curves.append(loop)
+
+        trim_dict = {}
+        trim_dict['count'] = len(trim_curves)
+        trim_dict['data'] = []
+        for loop in trim_curves:
+            trim_dict['data'].append(loop)
+        return trim_dict
+
+
+class SurfaceFactory:
+    def create_surface_object(self, face, f_id):
+        """The handler for face, or None for surface types nobody registered.
+
+        The adaptor is built once here and shared by the handler, its trims and
+        (for offset surfaces) the handler of the basis surface.
+        """
+        surf = BRepAdaptor_Surface(face, True)
+        handler = SURFACE_HANDLERS.get(surf.GetType())
+        if handler is None:
+            return None
+        return handler(face, surf, f_id)
+
+
+# The handler modules register themselves on import
+import Primitive_surface
+import NURBS_surface
+import Swept_surface
@@ -0,0 +1,122 @@
+import os
+import time
+import subprocess
+import multiprocessing
+
+import pytest
+
+pytest.importorskip('OCC.Core')
+import batch
+from instrument import stage
+from versions import SECTION_VERSIONS
+from batch import BatchRunner, output_filename, default_mesh_threads
+
+
+def test_output_filenames_do_not_collide(tmp_path):
+    root = str(tmp_path / 'in')
+    a = output_filename(os.path.join(root, 'a', 'part.step'), 'out', 'json', root)
+    b = output_filename(os.path.join(root, 'b', 'part.step'), 'out', 'json', root)
+    assert a == os.path.join('out', 'a', 'part.json')
+    assert b == os.path.join('out', 'b', 'part.json')
+    # Outside the input root, or without one, the folder is hashed into the name
+    c = output_filename(str(tmp_path / 'c' / 'part.step'), 'out', 'json', root)
+    d = output_filename(str(tmp_path / 'd' / 'part.step'), 'out', 'json')
+    assert os.path.dirname(c) == os.path.dirname(d) == 'out'
+    assert c != d and os.path.basename(c).startswith('part-')
+
+
+@pytest.mark.parametrize('workers,solid_workers', [(1, None), (3, None), (2, 2), (4, 3), (16, 1)])
+def test_mesh_threads_fit_in_the_cores(monkeypatch, workers, solid_workers):
+    monkeypatch.setattr(os, 'cpu_count', lambda: 16)
+    runner = BatchRunner('out', workers=workers, parse_options={'solid_workers': solid_workers})
+    assert runner.mesh_threads >= 1
+    assert workers * (solid_workers or 1) * runner.mesh_threads <= os.cpu_count()
+    assert runner.mesh_threads == default_mesh_threads(workers, {'solid_workers': solid_workers})
+
+
+class RecordingShape:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def update_config(self, config, **options):
+        self.calls.append(options)
+        return {'topology'}
+
+
+@pytest.mark.parametrize('missing', [None, 'topology'])
+def test_update_output_reads_only_stale_files(monkeypatch, missing):
+    calls = []
+    monkeypatch.setattr(batch, 'create_shape_object', lambda filename, *args: RecordingShape(calls))
+    versions = {name: version for name, version in SECTION_VERSIONS.items() if name != missing}
+    config = {'shape': 'Compound', 'data': [{'solid id': 1, 'data': [], 'versions': versions}]}
+    updated = batch.update_output('model.step', config, {'mesh_params': {'linear_deflection': 0.1}, 'timeout': 5})
+    if missing is None:
+        assert updated == set() and calls == []
+    else:
+        # Only the update options are passed on
+        assert updated == {'topology'} and calls == [{'mesh_params': {'linear_deflection': 0.1}}]
+
+
+def alive(pid):
+    try:
+        with open('/proc/%d/stat' % pid) as f:
+            # Killed processes nobody has reaped yet are zombies
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+def hanging_convert(filename, output_dir, *args):
+    # A worker stuck on a file, with a child of its own (like a solid-parsing pool)
+    child = subprocess.Popen(['sleep', '60'])
+    pid_file = os.path.join(output_dir, os.path.basename(filename) + '.pids')
+    with open(pid_file + '.tmp', 'w') as f:
+        f.write('%d %d' % (os.getpid(), child.pid))
+    os.replace(pid_file + '.tmp', pid_file)
+    time.sleep(60)
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason="the patched convert_file only reaches fork-started workers")
+def test_interrupt_kills_worker_groups(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, 'convert_file', hanging_convert)
+    filenames = [str(tmp_path / ('part%d.step' % i)) for i in range(2)]
+    pid_files = [os.path.join(str(tmp_path), os.path.basename(f) + '.pids') for f in filenames]
+
+    runner = BatchRunner(str(tmp_path), workers=2, timeout=0)
+    original_expired = runner._expired
+
+    def expired(workers):
+        # Stands in for Ctrl-C, which only reaches the parent, once both workers are stuck
+        if all(os.path.exists(f) for f in pid_files):
+            raise KeyboardInterrupt
+        return original_expired(workers)
+
+    monkeypatch.setattr(runner, '_poll_interval', lambda workers: 0.1)
+    monkeypatch.setattr(runner, '_expired', expired)
+    with pytest.raises(KeyboardInterrupt):
+        runner.run(filenames)
+
+    pids = [int(pid) for f in pid_files for pid in open(f).read().split()]
+    deadline = time.time() + 10
+    while any(alive(pid) for pid in pids) and time.time() < deadline:
+        time.sleep(0.1)
+    assert not any(alive(pid) for pid in pids)
+
+
+def stuck_convert(filename, output_dir, *args):
+    with stage('read_step_file'):
+        with stage('extract_trims_curves'):
+            time.sleep(60)
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason="the patched convert_file only reaches fork-started workers")
+def test_timeout_reports_stage(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, 'convert_file', stuck_convert)
+    records = []
+    runner = BatchRunner(str(tmp_path), workers=1, timeout=1, on_result=records.append)
+    summary = runner.run([str(tmp_path / 'part.step')])
+    assert summary['timeout'] == 1
+    assert records[0]['stage'] == 'extract_trims_curves'
+    assert 0 < records[0]['stage_seconds'] <= records[0]['seconds']
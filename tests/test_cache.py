@@ -0,0 +1,34 @@
+import os
+
+from cache import ResultCache, cache_key
+
+
+def write(filename, content):
+    with open(filename, 'wb') as f:
+        f.write(content)
+    return filename
+
+
+def test_duplicates_share_a_key(tmp_path):
+    a = write(str(tmp_path / 'a.step'), b"HEADER;\nFILE_NAME('a.step');\nENDSEC;\nDATA;\n#1=FOO();\nENDSEC;\n")
+    b = write(str(tmp_path / 'b.step'), b"HEADER;\nFILE_NAME('b.step');\nENDSEC;\nDATA;\n#1=FOO();\nENDSEC;\n")
+    assert cache_key(a, 'json') == cache_key(b, 'json')
+    assert cache_key(a, 'json') != cache_key(a, 'npz')
+
+
+def test_evict_counts_unlinked_entries_only(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    outputs = []
+    for i, key in enumerate(['aa01', 'bb02', 'cc03']):
+        outputs.append(write(str(tmp_path / ('out%d.json' % i)), b"x" * 1000))
+        cache.store(key, '.json', outputs[-1])
+        os.utime(cache.path(key, '.json'), (i, i))
+    # Linked entries free nothing, so they are neither counted nor evicted
+    assert cache.evict(0) == 0
+    os.unlink(outputs[0])
+    os.unlink(outputs[2])
+    assert cache.evict(1000) == 1
+    assert not os.path.exists(cache.path('aa01', '.json'))
+    assert os.path.exists(cache.path('bb02', '.json'))
+    assert os.path.exists(cache.path('cc03', '.json'))
+    assert cache.fetch('cc03', '.json', str(tmp_path / 'again.json'))
@@ -0,0 +1,73 @@
+import json
+import zipfile
+
+import numpy as np
+import pytest
+
+from columnar import write_columnar, read_columnar
+
+
+def plain(value):
+    """value with its arrays turned into lists, as read_columnar's to_config returns them."""
+    return json.loads(json.dumps(value, default=lambda a: a.tolist()))
+
+
+def model():
+    faces = [
+        {'face_id': 1, 'kind': 'Plane', 'area': 2.5, 'normal': np.array([0.0, 0.0, 1.0]),
+         'trims': [[{'type': 'line', 'interval': [0.0, 1.0]}, {'type': 'circle', 'interval': [0.0, 6.28]}]]},
+        # Missing and None fields, a different array shape, a ragged list
+        {'face_id': 2, 'kind': 'Bspline Surface', 'weights': np.ones((2, 3)), 'normal': None,
+         'knots': [[0.0, 1.0], [0.0, 0.5, 1.0]]},
+        {'face_id': 3, 'kind': 'Cylinder', 'area': 1.0, 'tags': ['seam', 'periodic']},
+    ]
+    return {'shape': 'Compound', 'data': [
+        {'solid id': 1, 'volume': 3.0, 'data': faces,
+         'face_table': {'face_id': np.array([1, 2, 3], dtype=np.int32), 'area': np.array([2.5, 0.0, 1.0])}},
+        # Empty containers in one row must not decide the column's kind for the others
+        {'solid id': 2, 'volume': 0.0, 'data': [{'face_id': 1, 'kind': 'Plane', 'tags': []}],
+         'face_table': {'face_id': np.zeros(0, dtype=np.int32), 'area': np.zeros(0)}},
+    ]}
+
+
+def test_round_trip(tmp_path):
+    filename = str(tmp_path / 'model.npz')
+    write_columnar(model(), filename)
+    assert read_columnar(filename).to_config() == plain(model())
+
+
+def test_empty_then_filled(tmp_path):
+    config = {'data': [{'tags': []}, {'tags': ['a', 'b']}, {'tags': np.zeros((0, 3))}, {'tags': ['c']}]}
+    filename = str(tmp_path / 'model.npz')
+    write_columnar(config, filename)
+    assert read_columnar(filename).to_config() == plain(config)
+
+
+def test_mixed_kinds_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        write_columnar({'data': [{'value': 'a'}, {'value': 1.0}]}, str(tmp_path / 'model.npz'))
+
+
+def test_columns_are_memory_mapped(tmp_path):
+    filename = str(tmp_path / 'model.npz')
+    write_columnar(model(), filename)
+    columnar = read_columnar(filename)
+    faces = columnar.table('root/data/data')
+    area = faces.column('area')
+    # Views on the mapped file, not copies
+    assert not area.values.flags.owndata and not area.values.flags.writeable
+    assert area.values.tolist() == [2.5, 1.0]
+    assert [faces.column('kind').row(r) for r in range(len(faces))] == \
+        ['Plane', 'Bspline Surface', 'Cylinder', 'Plane']
+    assert faces.column('weights').row(1).shape == (2, 3)
+    assert not faces.column('normal').present(2)
+    assert faces.column('normal').row(1) is None
+
+
+def test_compressed_files_are_rejected(tmp_path):
+    filename = str(tmp_path / 'model.npz')
+    np.savez_compressed(filename, meta=np.zeros(3))
+    with zipfile.ZipFile(filename) as zf:
+        assert zf.infolist()[0].compress_type != zipfile.ZIP_STORED
+    with pytest.raises(ValueError):
+        read_columnar(filename)
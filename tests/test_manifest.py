@@ -0,0 +1,47 @@
+import os
+
+from manifest import Manifest, file_key
+
+
+def write(filename, content):
+    with open(filename, 'wb') as f:
+        f.write(content)
+    return filename
+
+
+def result(filename, status, output=None):
+    record = {'input': filename, 'status': status, 'output': output, 'error': None, 'seconds': 1.0}
+    if status not in ('timeout', 'crash'):
+        record['size'], record['mtime_ns'] = file_key(filename)
+    return record
+
+
+def test_resume(tmp_path):
+    inputs = [write(str(tmp_path / ('part%d.step' % i)), b"DATA;\n") for i in range(4)]
+    output = write(str(tmp_path / 'part0.json'), b"{}")
+    manifest = Manifest(str(tmp_path / 'manifest.sqlite'))
+    manifest.record(result(inputs[0], 'ok', output))
+    manifest.record(result(inputs[1], 'timeout'))
+    manifest.record(result(inputs[2], 'error'))
+    manifest.close()
+
+    # A new run reads the checkpoint back
+    manifest = Manifest(str(tmp_path / 'manifest.sqlite'))
+    assert manifest.pending(inputs) == [inputs[3]]
+    assert manifest.pending(inputs, retry_failed=True) == inputs[1:]
+    assert manifest.status_counts() == {'ok': 1, 'timeout': 1, 'error': 1}
+    manifest.close()
+
+
+def test_changed_or_missing_outputs_are_pending(tmp_path):
+    inputs = [write(str(tmp_path / ('part%d.step' % i)), b"DATA;\n") for i in range(3)]
+    outputs = [write(str(tmp_path / ('part%d.json' % i)), b"{}") for i in range(2)]
+    manifest = Manifest(str(tmp_path / 'manifest.sqlite'))
+    manifest.record(result(inputs[0], 'ok', outputs[0]))
+    manifest.record(result(inputs[1], 'ok', outputs[1]))
+    manifest.record(result(inputs[2], 'crash'))
+    os.unlink(outputs[1])
+    write(inputs[2], b"DATA;\n#1=FOO();\n")
+    os.utime(inputs[2], ns=(0, 0))
+    assert manifest.pending(inputs) == inputs[1:]
+    manifest.close()
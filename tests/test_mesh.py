@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip('OCC.Core')
+from OCC.Core.BRepPrimAPI import BRepPrimAPI_MakeSphere
+
+from abstract import Solid
+from mesh import triangulate_shape
+
+FINE = {'linear_deflection': 0.01, 'angular_deflection': 0.1}
+COARSE = {'linear_deflection': 1.0, 'angular_deflection': 0.8}
+
+
+def triangle_count(triangulation):
+    return len(triangulation['triangles'])
+
+
+def test_coarse_after_fine():
+    fresh = triangle_count(triangulate_shape(BRepPrimAPI_MakeSphere(7).Shape(), COARSE))
+    shape = BRepPrimAPI_MakeSphere(7).Shape()
+    fine = triangulate_shape(shape, FINE)
+    coarse = triangulate_shape(shape, COARSE)
+    assert triangle_count(coarse) == fresh < triangle_count(fine)
+    assert coarse['params']['linear_deflection'] == COARSE['linear_deflection']
+
+
+def test_solid_coarse_after_fine():
+    fresh = triangle_count(triangulate_shape(BRepPrimAPI_MakeSphere(7).Shape(), COARSE))
+    solid = Solid(BRepPrimAPI_MakeSphere(7).Shape(), 'Solid', 1)
+    fine = solid.compute_triangles(FINE)
+    assert triangle_count(solid.compute_triangles(COARSE)) == fresh < triangle_count(fine)
+    # The default mesh is computed once and reused for the same parameters
+    assert solid.compute_triangles() is solid.compute_triangles({}) is solid.mesh
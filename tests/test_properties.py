@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('OCC.Core')
+from properties import FaceTable, FACE_KINDS
+from columnar import write_columnar, read_columnar
+
+
+def face_table(faces):
+    table = FaceTable()
+    for face_id, kind in faces:
+        table.add(face_id, kind, 1.0, np.arange(9.0))
+    return table.fill({})
+
+
+def test_kind_codes():
+    table = face_table([(1, 'Plane'), (2, 'Bspline Surface'), (3, 'unsupported')])
+    assert table['kind'].dtype == np.int8
+    assert [table['kinds'][code] if code >= 0 else None for code in table['kind']] == \
+        ['Plane', 'Bspline Surface', None]
+    assert table['kinds'] == FACE_KINDS
+    assert table['bounding_box'].shape == (3, 6)
+
+
+def test_solid_without_faces_in_columnar_output(tmp_path):
+    config = {'shape': 'Compound', 'data': [{'solid id': 1, 'face_table': face_table([(1, 'Plane'), (2, 'Cone')])},
+                                            {'solid id': 2, 'face_table': face_table([])}]}
+    filename = str(tmp_path / 'model.npz')
+    write_columnar(config, filename)
+    solids = read_columnar(filename).table('root/data')
+    kind = solids.column('face_table', 'kind')
+    assert kind.kind == 'num'
+    assert kind.values.tolist() == [FACE_KINDS.index('Plane'), FACE_KINDS.index('Cone')]
+    assert solids.column('face_table', 'bounding_box').row(1).shape == (0, 6)
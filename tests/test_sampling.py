@@ -0,0 +1,178 @@
+import numpy as np
+
+from sampling import basis_functions, evaluate_bspline_curve, evaluate_bspline_surface, evaluate_primitive_surface, \
+    normals, discretize_curve, trim_segments, inside_trims, classify_uv, sample_face
+
+KNOTS = [0.0, 0.0, 0.0, 0.0, 0.5, 1.0, 1.0, 2.0, 2.0, 2.0, 2.0]
+
+
+def cox_de_boor(knots, i, degree, t):
+    if degree == 0:
+        if knots[i] <= t < knots[i + 1]:
+            return 1.0
+        # The end of the range belongs to the last non-empty span
+        return 1.0 if t == knots[-1] and knots[i] < knots[i + 1] == knots[-1] else 0.0
+    value = 0.0
+    if knots[i + degree] > knots[i]:
+        value += (t - knots[i]) / (knots[i + degree] - knots[i]) * cox_de_boor(knots, i, degree - 1, t)
+    if knots[i + degree + 1] > knots[i + 1]:
+        value += (knots[i + degree + 1] - t) / (knots[i + degree + 1] - knots[i + 1]) * \
+            cox_de_boor(knots, i + 1, degree - 1, t)
+    return value
+
+
+def quarter_cylinder():
+    """Rational quadratic quarter of the unit cylinder (u around the axis) of height 2 (v)."""
+    arc = np.array([[1.0, 0.0], [1.0, 1.0], [0.0, 1.0]])
+    points = np.zeros((3, 2, 3))
+    points[:, :, :2] = arc[:, None]
+    points[:, 1, 2] = 2.0
+    weights = np.array([[1.0, 1.0], [np.sqrt(0.5)] * 2, [1.0, 1.0]])
+    return {'kind': 'Bspline Surface', 'degree_u': 2, 'degree_v': 1, 'knotvector_u': [0.0, 0.0, 0.0, 1.0, 1.0, 1.0],
+            'knotvector_v': [0.0, 0.0, 1.0, 1.0], 'control_points': {'points': points, 'weights': weights}}
+
+
+def line(a, b):
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    return {'type': 'line', 'data': {'location': list(a), 'direction': list(b - a)}, 'interval': [0.0, 1.0]}
+
+
+def rectangle(u_min, u_max, v_min, v_max):
+    corners = [(u_min, v_min), (u_max, v_min), (u_max, v_max), (u_min, v_max)]
+    return [line(corners[i], corners[(i + 1) % 4]) for i in range(4)]
+
+
+def circle(center, radius):
+    return {'type': 'circle', 'interval': [0.0, 2 * np.pi],
+            'data': {'location': list(center), 'x_axis': [1.0, 0.0], 'y_axis': [0.0, 1.0], 'radius': radius}}
+
+
+def plane_face(uv_bounds, loops):
+    surface = {'kind': 'Plane', 'location': [0.0, 0.0, 0.0], 'x_axis': [1.0, 0.0, 0.0], 'y_axis': [0.0, 1.0, 0.0],
+               'z_axis': [0.0, 0.0, 1.0], 'uv_bounds': uv_bounds, 'trims': {'data': loops}}
+    return {'shape': {'face_id': 1, 'data': surface}}
+
+
+def grid(u_min, u_max, v_min, v_max, n):
+    u, v = np.linspace(u_min, u_max, n), np.linspace(v_min, v_max, n)
+    return np.stack(np.meshgrid(u, v, indexing='ij'), axis=-1).reshape(-1, 2)
+
+
+def test_basis_functions():
+    params = np.linspace(0.0, 2.0, 41)
+    spans, N, _ = basis_functions(KNOTS, 3, params)
+    assert np.allclose(N.sum(axis=1), 1.0)
+    for t, span, values in zip(params, spans, N):
+        expected = [cox_de_boor(KNOTS, span - 3 + k, 3, t) for k in range(4)]
+        assert np.allclose(values, expected)
+
+
+def test_basis_derivatives():
+    h = 1e-6
+    # Away from the knots, where the cubic basis is smooth
+    params = np.array([0.1, 0.3, 0.7, 0.9, 1.4, 1.9])
+    spans, _, dN = basis_functions(KNOTS, 3, params)
+    spans_after, after, _ = basis_functions(KNOTS, 3, params + h)
+    spans_before, before, _ = basis_functions(KNOTS, 3, params - h)
+    assert np.array_equal(spans_after, spans) and np.array_equal(spans_before, spans)
+    assert np.allclose(dN, (after - before) / (2 * h), atol=1e-5)
+
+
+def test_rational_curve():
+    curve = {'degree': 2, 'knotvector': [0.0, 0.0, 0.0, 1.0, 1.0, 1.0],
+             'control_points': {'points': [[1.0, 0.0], [1.0, 1.0], [0.0, 1.0]], 'weights': [1.0, np.sqrt(0.5), 1.0]}}
+    points = evaluate_bspline_curve(curve, np.linspace(0.0, 1.0, 101))
+    assert np.allclose(np.linalg.norm(points, axis=1), 1.0, rtol=0, atol=1e-14)
+    assert np.allclose(points[[0, 50, -1]], [[1.0, 0.0], [np.sqrt(0.5), np.sqrt(0.5)], [0.0, 1.0]])
+
+
+def test_rational_surface():
+    u, v = np.linspace(0.0, 1.0, 21), np.linspace(0.0, 1.0, 5)
+    S, Su, Sv = evaluate_bspline_surface(quarter_cylinder(), u, v)
+    assert S.shape == (21, 5, 3)
+    assert np.allclose(np.linalg.norm(S[..., :2], axis=-1), 1.0, rtol=0, atol=1e-14)
+    assert np.allclose(S[..., 2], 2.0 * v[None, :])
+    # Derivatives against central differences
+    h = 1e-6
+    du = (evaluate_bspline_surface(quarter_cylinder(), u[1:-1] + h, v)[0] -
+          evaluate_bspline_surface(quarter_cylinder(), u[1:-1] - h, v)[0]) / (2 * h)
+    assert np.allclose(Su[1:-1], du, atol=1e-6)
+    assert np.allclose(Sv, [0.0, 0.0, 2.0])
+    # Su x Sv points away from the axis
+    n = normals(Su, Sv)
+    assert np.allclose(n[..., :2], S[..., :2])
+    assert np.allclose(normals(Su, Sv, reversed=True), -n)
+
+
+def test_primitive_derivatives():
+    frame = {'location': [1.0, -2.0, 0.5], 'x_axis': [0.0, 1.0, 0.0], 'y_axis': [0.0, 0.0, 1.0],
+             'z_axis': [1.0, 0.0, 0.0]}
+    faces = [dict(frame, kind='Plane'), dict(frame, kind='Cylinder', radius=2.0),
+             dict(frame, kind='Cone', radius=2.0, angle=0.3), dict(frame, kind='Sphere', radius=2.0),
+             dict(frame, kind='Torus', max_radius=3.0, min_radius=0.5)]
+    u, v = np.linspace(0.1, 6.0, 7), np.linspace(-1.2, 1.2, 5)
+    h = 1e-6
+    for face in faces:
+        S, Su, Sv = evaluate_primitive_surface(face, u, v)
+        du = (evaluate_primitive_surface(face, u + h, v)[0] - evaluate_primitive_surface(face, u - h, v)[0]) / (2 * h)
+        dv = (evaluate_primitive_surface(face, u, v + h)[0] - evaluate_primitive_surface(face, u, v - h)[0]) / (2 * h)
+        assert np.allclose(Su, du, atol=1e-6), face['kind']
+        assert np.allclose(Sv, dv, atol=1e-6), face['kind']
+
+
+def test_circle_within_tolerance():
+    curve = circle((0.0, 0.0), 2.0)
+    polyline = discretize_curve(curve, 1e-3)
+    assert np.allclose(np.linalg.norm(polyline, axis=1), 2.0)
+    # Chord midpoints are within the tolerance of the circle
+    middle = (polyline[:-1] + polyline[1:]) / 2
+    assert np.all(2.0 - np.linalg.norm(middle, axis=1) <= 1e-3)
+
+
+def test_untrimmed_rectangle_keeps_its_boundary():
+    samples = sample_face(plane_face([0.0, 1.0, 0.0, 2.0], [rectangle(0.0, 1.0, 0.0, 2.0)]), 8, 8)
+    assert len(samples['points']) == 64
+    assert np.allclose(samples['normals'], [0.0, 0.0, 1.0])
+
+
+def test_rectangle():
+    face = plane_face([0.0, 4.0, 0.0, 4.0], [rectangle(1.0, 3.0, 1.0, 2.0)])
+    uv = grid(0.0, 4.0, 0.0, 4.0, 17)
+    inside = classify_uv(face['shape']['data'], uv)
+    expected = (uv[:, 0] >= 1.0) & (uv[:, 0] <= 3.0) & (uv[:, 1] >= 1.0) & (uv[:, 1] <= 2.0)
+    assert np.array_equal(inside, expected)
+
+
+def test_hole():
+    face = plane_face([0.0, 4.0, 0.0, 4.0], [rectangle(0.0, 4.0, 0.0, 4.0), [circle((2.0, 2.0), 1.0)]])
+    uv = grid(0.0, 4.0, 0.0, 4.0, 41)
+    inside = classify_uv(face['shape']['data'], uv)
+    distance = np.linalg.norm(uv - 2.0, axis=1)
+    # Samples on the hole's boundary ((2, 1), (1, 2), ...) belong to the face
+    assert np.array_equal(inside, distance >= 1.0 - 1e-9)
+    samples = sample_face(face, 41, 41)
+    assert len(samples['uv']) == inside.sum()
+
+
+def test_crossings_match_brute_force():
+    rng = np.random.default_rng(0)
+    loops = [rectangle(0.0, 4.0, 0.0, 4.0), [circle((1.0, 1.0), 0.5)], [circle((3.0, 2.5), 0.75)]]
+    segments = trim_segments({'data': loops}, 1e-3)
+    uv = rng.uniform(-0.5, 4.5, (5000, 2))
+    # Small chunks exercise the splitting of the (segment, sample) pairs
+    inside = inside_trims(segments, uv, max_pairs=997)
+    a, b = segments[:, 0], segments[:, 1]
+    straddles = (a[None, :, 0] <= uv[:, None, 0]) != (b[None, :, 0] <= uv[:, None, 0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        v_cross = a[None, :, 1] + (uv[:, None, 0] - a[None, :, 0]) * (b[:, 1] - a[:, 1]) / (b[:, 0] - a[:, 0])
+    expected = (np.sum(straddles & (v_cross > uv[:, None, 1]), axis=1) & 1).astype(bool)
+    assert np.array_equal(inside, expected)
+
+
+def test_sphere_indirect_frame():
+    # A left-handed placement: the main direction is -X^Y
+    face = {'kind': 'Sphere', 'location': [1.0, 2.0, 3.0], 'x_axis': [1.0, 0.0, 0.0], 'y_axis': [0.0, 1.0, 0.0],
+            'z_axis': [0.0, 0.0, -1.0], 'radius': 2.0}
+    S, Su, Sv = evaluate_primitive_surface(face, np.array([0.0]), np.array([np.pi / 2, 0.5]))
+    assert np.allclose(S[0, 0], [1.0, 2.0, 1.0])
+    assert np.allclose(np.linalg.norm(S - [1.0, 2.0, 3.0], axis=-1), 2.0)
@@ -0,0 +1,58 @@
+import time
+
+from step_index import StepIndex
+
+HEADER = (b"ISO-10303-21;\nHEADER;\n"
+          b"FILE_DESCRIPTION(('a part'),'2;1');\n"
+          b"FILE_NAME('part.step','2018-04-27T08:23:48',('someone'),(''),'pre','sys','');\n"
+          b"FILE_SCHEMA(('AUTOMOTIVE_DESIGN'));\nENDSEC;\n")
+DATA = (b"DATA;\n"
+        b"#1=CARTESIAN_POINT('origin;',(0.,0.,0.));\n"
+        b"#2=DIRECTION('it''s',(0.,0.,1.));\n"
+        b"#3=(BOUNDED_SURFACE()B_SPLINE_SURFACE(1,1,((#1,#1),(#1,#1)),.UNSPECIFIED.,.F.,.F.,.F.)SURFACE());\n")
+
+
+def write(tmp_path, content):
+    filename = str(tmp_path / 'part.step')
+    with open(filename, 'wb') as f:
+        f.write(content)
+    return filename
+
+
+def test_index(tmp_path):
+    index = StepIndex(write(tmp_path, HEADER + DATA + b"ENDSEC;\nEND-ISO-10303-21;\n"))
+    try:
+        assert len(index) == 3
+        assert index.header['name'] == 'part.step'
+        assert index.header['implementation_level'] == '2;1'
+        assert index.header['schema'] == ['AUTOMOTIVE_DESIGN']
+        assert index.entity_type(1) == ('CARTESIAN_POINT',)
+        assert index.entity_type(3) == ('BOUNDED_SURFACE', 'B_SPLINE_SURFACE', 'SURFACE')
+        assert index.parameters(1) == ['origin;', [0.0, 0.0, 0.0]]
+        assert index.parameters(2) == ["it's", [0.0, 0.0, 1.0]]
+        assert index.type_counts()['SURFACE'] == 1
+    finally:
+        index.close()
+
+
+def test_truncated_statement(tmp_path):
+    # A statement cut off before its ';' used to backtrack exponentially in its length
+    start = time.time()
+    index = StepIndex(write(tmp_path, HEADER + DATA + b"#4=FOO(" + b"a" * 100000))
+    try:
+        assert len(index) == 3
+        assert 4 not in index
+    finally:
+        index.close()
+    assert time.time() - start < 5
+
+
+def test_truncated_header(tmp_path):
+    start = time.time()
+    index = StepIndex(write(tmp_path, b"ISO-10303-21;\nHEADER;\nFILE_NAME('part.step'," + b"a" * 100000))
+    try:
+        assert len(index) == 0
+        assert index.header == {}
+    finally:
+        index.close()
+    assert time.time() - start < 5
@@ -0,0 +1,48 @@
+import time
+import multiprocessing
+
+import pytest
+
+import triage
+from step_index import StepIndex
+from triage import schedule
+
+
+def write_files(tmp_path, sizes):
+    filenames = []
+    for i, size in enumerate(sizes):
+        filename = str(tmp_path / ('part%d.step' % i))
+        with open(filename, 'wb') as f:
+            f.write(b"DATA;\n" + b"#1=ADVANCED_FACE('',(),#2,.T.);\n" * size + b"ENDSEC;\n")
+        filenames.append(filename)
+    return filenames
+
+
+def test_largest_first(tmp_path):
+    filenames = write_files(tmp_path, [1, 30, 5])
+    ordered, _ = schedule(filenames, 'largest-first', workers=2)
+    assert ordered == [filenames[1], filenames[2], filenames[0]]
+
+
+class HangingIndex(StepIndex):
+
+    def __init__(self, filename):
+        if filename.endswith('part1.step'):
+            time.sleep(60)
+        StepIndex.__init__(self, filename)
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason="the patched scan only reaches fork-started processes")
+def test_scan_timeout(tmp_path, monkeypatch):
+    monkeypatch.setattr(triage, 'StepIndex', HangingIndex)
+    filenames = write_files(tmp_path, [1, 30, 5])
+    start = time.time()
+    records = triage.triage(filenames, workers=3, timeout=1)
+    assert time.time() - start < 30
+    assert [r['input'] for r in records] == filenames
+    # The hanging file falls back to its size; the others keep their entity counts
+    assert 'ADVANCED_FACE' not in records[1]
+    assert records[1]['cost'] > 0
+    assert records[0]['ADVANCED_FACE'] == 1
+    assert records[2]['ADVANCED_FACE'] == 5
@@ -0,0 +1,30 @@
+import versions
+from versions import SECTION_VERSIONS, stale_sections, is_stale
+
+
+def stamped(**changes):
+    return {'solid id': 1, 'data': [], 'versions': dict(SECTION_VERSIONS, **changes)}
+
+
+def test_up_to_date():
+    assert stale_sections(stamped()) == set()
+    assert not is_stale(stamped())
+    assert not is_stale({'shape': 'Compound', 'data': [stamped(), stamped()]})
+
+
+def test_version_bump(monkeypatch):
+    solid = stamped()
+    monkeypatch.setitem(versions.SECTION_VERSIONS, 'surfaces', SECTION_VERSIONS['surfaces'] + 1)
+    # Only the bumped section is stale, the others are unchanged
+    assert stale_sections(solid) == {'surfaces'}
+    assert is_stale({'shape': 'Compound', 'data': [solid]})
+
+
+def test_older_and_missing_sections():
+    assert stale_sections(stamped(trims=SECTION_VERSIONS['trims'] - 1)) == {'trims'}
+    solid = stamped()
+    del solid['versions']['topology']
+    assert stale_sections(solid) == {'topology'}
+    assert is_stale({'shape': 'Compound', 'data': [stamped(), solid]})
+    # Outputs written before versions were stamped are stale in every section
+    assert stale_sections({'solid id': 1, 'data': []}) == set(SECTION_VERSIONS)
@@ -0,0 +1,76 @@
+import json
+
+import numpy as np
+import pytest
+
+from writers import NumpyJSONEncoder, write_json, read_json, write_jsonl, read_jsonl
+
+CONFIG = {
+    'shape': 'Compound',
+    'name': 'café – "part"',
+    'data': [
+        {'solid id': 1, 'bounding_box': np.array([0.0, 0.0, 0.0, 1.0, 2.0, 3.0]),
+         'triangles': {'vertices': np.arange(6.0).reshape(2, 3), 'triangles': np.zeros((0, 3), dtype=np.int64),
+                       'params': {'linear_deflection': np.float64(0.3), 'relative': np.bool_(False)}},
+         'data': [{'face id': np.int64(1), 'area': np.float32(0.5), 'trims': [[], [[1, 2], [3, 4]]]},
+                  {'face id': 2, 'kind': None, 'degree': np.int8(3), 'knots': (0.0, 1.0)}],
+         'edges': [{'edge id': 1, 'faces': [1, 2]}],
+         'face_table': {'kind': np.array([0, -1], dtype=np.int8), 'kinds': ['Plane', 'Cone']}},
+        {'solid id': 2, 'bounding_box': [], 'data': [{'face id': 1, 'nested': {'a': {'b': {'c': [{}]}}}}],
+         'edges': [{'edge id': 1, 'faces': []}]},
+    ],
+}
+
+
+def json_dump(value, indent=4):
+    return json.dumps(value, cls=NumpyJSONEncoder, indent=indent)
+
+
+def written(tmp_path, value, indent=4):
+    filename = str(tmp_path / 'out.json')
+    write_json(value, filename, indent)
+    with open(filename, 'rb') as f:
+        return f.read().decode('utf-8')
+
+
+@pytest.mark.parametrize('value', [
+    CONFIG,
+    {}, [], {'a': {}, 'b': [], 'c': [[], {}], 'd': ()},
+    {'nan': float('nan'), 'inf': [float('inf'), -float('inf')], 'x': np.float64('nan')},
+    {1: 'int', 2.5: 'float', True: 'bool', None: 'none', float('inf'): 'inf'},
+    {'scalars': [np.int64(7), np.float32(0.25), np.bool_(True), np.uint8(255)], 'array': np.eye(2)},
+    [1, 'two', [3, [4, [5]]], {'six': 6}],
+    'text', 1.5, None,
+])
+@pytest.mark.parametrize('indent', [4, 2])
+def test_json_matches_json_dump(tmp_path, value, indent):
+    assert written(tmp_path, value, indent) == json_dump(value, indent)
+
+
+def test_generators_are_written_as_lists(tmp_path):
+    faces = [{'face id': i, 'area': np.float64(i)} for i in range(3)]
+    streamed = {'solid id': 1, 'data': (face for face in faces), 'empty': (face for face in [])}
+    assert written(tmp_path, streamed) == json_dump({'solid id': 1, 'data': faces, 'empty': []})
+
+
+def test_unsupported_keys_are_rejected(tmp_path):
+    with pytest.raises(TypeError):
+        written(tmp_path, {(1, 2): 'tuple'})
+
+
+def test_jsonl_round_trip(tmp_path):
+    json_filename, jsonl_filename = str(tmp_path / 'model.json'), str(tmp_path / 'model.jsonl')
+    write_json(CONFIG, json_filename)
+    write_jsonl(CONFIG, jsonl_filename)
+    assert read_jsonl(jsonl_filename) == read_json(json_filename)
+    with open(jsonl_filename) as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 1 + 2 + 3 + 2 + 1
+    assert lines[0] == json.dumps({'record': 'compound', 'shape': 'Compound', 'name': CONFIG['name']})
+
+
+def test_jsonl_single_solid(tmp_path):
+    solid = CONFIG['data'][1]
+    filename = str(tmp_path / 'solid.jsonl')
+    write_jsonl(solid, filename)
+    assert read_jsonl(filename) == json.loads(json_dump(solid))
@@ -0,0 +1,110 @@
+import numpy as np
+
+from OCC.Core.BRep import BRep_Tool
+from OCC.Core.TopAbs import TopAbs_FACE, TopAbs_EDGE, TopAbs_VERTEX, TopAbs_REVERSED
+from OCC.Core.TopExp import TopExp_Explorer, topexp_MapShapes, topexp_MapShapesAndAncestors, \
+    topexp_FirstVertex, topexp_LastVertex
+from OCC.Core.TopTools import (TopTools_IndexedMapOfShape, TopTools_IndexedDataMapOfShapeListOfShape,
+                               TopTools_ListIteratorOfListOfShape)
+
+from instrument import count
+
+
+def _csr(rows, columns, data, n_rows):
+    """(indptr, indices, data) of the sparse matrix with the given entries, sorted by row then column."""
+    order = np.lexsort((columns, rows))
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return indptr, columns[order].astype(np.int32), data[order].astype(np.int32)
+
+
+def extract_topology(shape, edge_registry=None):
+    """Face / edge / vertex adjacency of a solid as compact arrays, from maps built once.
+
+    Faces, edges and vertices are numbered from 0 in the order TopExp maps them, which
+    for faces is the order of 'face_id' (face index = face_id - 1). With an
+    edges.EdgeRegistry, the edges are registered in that order first, so 'edge id' =
+    edge index + 1 and the registry holds every edge's 3D curve.
+
+        vertices                  (n_vertices, 3) coordinates
+        edge_vertices             (n_edges, 2) first and last vertex of every edge
+        edge_faces, _offsets      faces of every edge (CSR; a seam lists its face once)
+        face_edges, _offsets      edges of every face as the face uses them (CSR),
+        face_edge_orientation     with 1 where the face uses the edge reversed
+        face_adjacency_indptr,    face adjacency matrix in CSR form: faces i and j are
+        _indices, _edges          adjacent through every edge listed for entry (i, j)
+    """
+    face_map = TopTools_IndexedMapOfShape()
+    topexp_MapShapes(shape, TopAbs_FACE, face_map)
+    vertex_map = TopTools_IndexedMapOfShape()
+    topexp_MapShapes(shape, TopAbs_VERTEX, vertex_map)
+    # Every edge with the faces it bounds, in one traversal of the solid
+    edge_map = TopTools_IndexedDataMapOfShapeListOfShape()
+    topexp_MapShapesAndAncestors(shape, TopAbs_EDGE, TopAbs_FACE, edge_map)
+    n_faces, n_edges, n_vertices = face_map.Extent(), edge_map.Extent(), vertex_map.Extent()
+    count('topology_edges', n_edges)
+
+    vertices = np.zeros((n_vertices, 3))
+    for i in range(n_vertices):
+        vertices[i] = BRep_Tool.Pnt(vertex_map.FindKey(i + 1)).Coord()
+
+    edge_vertices = np.zeros((n_edges, 2), dtype=np.int32)
+    edge_faces = []
+    edge_faces_offsets = [0]
+    for i in range(n_edges):
+        edge = edge_map.FindKey(i + 1)
+        if edge_registry is not None:
+            edge_registry.edge_id(edge)
+        edge_vertices[i] = (vertex_map.FindIndex(topexp_FirstVertex(edge)) - 1,
+                            vertex_map.FindIndex(topexp_LastVertex(edge)) - 1)
+        faces = []
+        it = TopTools_ListIteratorOfListOfShape(edge_map.FindFromIndex(i + 1))
+        while it.More():
+            f = face_map.FindIndex(it.Value()) - 1
+            # A seam edge is listed once for each of its two uses in the same face
+            if f not in faces:
+                faces.append(f)
+            it.Next()
+        edge_faces.extend(faces)
+        edge_faces_offsets.append(len(edge_faces))
+
+    face_edges = []
+    face_edge_orientation = []
+    face_edges_offsets = [0]
+    for i in range(n_faces):
+        explorer = TopExp_Explorer(face_map.FindKey(i + 1), TopAbs_EDGE)
+        while explorer.More():
+            edge = explorer.Current()
+            face_edges.append(edge_map.FindIndex(edge) - 1)
+            face_edge_orientation.append(edge.Orientation() == TopAbs_REVERSED)
+            explorer.Next()
+        face_edges_offsets.append(len(face_edges))
+
+    edge_faces = np.array(edge_faces, dtype=np.int32)
+    edge_faces_offsets = np.array(edge_faces_offsets, dtype=np.int64)
+    # Face pairs of every edge bounding two or more faces, in both directions
+    per_edge = np.diff(edge_faces_offsets)
+    rows, columns, via = [], [], []
+    for e in np.nonzero(per_edge > 1)[0]:
+        faces = edge_faces[edge_faces_offsets[e]:edge_faces_offsets[e + 1]]
+        for a in faces:
+            for b in faces:
+                if a != b:
+                    rows.append(a)
+                    columns.append(b)
+                    via.append(e)
+    indptr, indices, adjacency_edges = _csr(np.array(rows, dtype=np.int64), np.array(columns, dtype=np.int64),
+                                            np.array(via, dtype=np.int64), n_faces)
+
+    topology = {}
+    topology['vertices'] = vertices
+    topology['edge_vertices'] = edge_vertices
+    topology['edge_faces'] = edge_faces
+    topology['edge_faces_offsets'] = edge_faces_offsets
+    topology['face_edges'] = np.array(face_edges, dtype=np.int32)
+    topology['face_edges_offsets'] = np.array(face_edges_offsets, dtype=np.int64)
+    topology['face_edge_orientation'] = np.array(face_edge_orientation, dtype=np.int8)
+    topology['face_adjacency_indptr'] = indptr
+    topology['face_adjacency_indices'] = indices
+    topology['face_adjacency_edges'] = adjacency_edges
+    return topology
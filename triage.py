@@ -0,0 +1,119 @@
+"""Estimate the parse cost of STEP files before parsing them, to schedule a batch.
+
+The estimate comes from cheap signals only: the file size, and optionally the
+entity counts of a step_index scan (faces, B-spline surfaces, edges, solids).
+Costs are in arbitrary units; only their ratios matter for scheduling.
+"""
+import os
+import math
+import multiprocessing
+
+from step_index import StepIndex
+
+# Relative cost of each signal, in "plane face" units
+COST_WEIGHTS = {
+    'bytes': 2e-5,
+    'ADVANCED_FACE': 1.0,
+    'B_SPLINE_SURFACE_WITH_KNOTS': 4.0,
+    'B_SPLINE_CURVE_WITH_KNOTS': 0.5,
+    'EDGE_CURVE': 0.2,
+    'MANIFOLD_SOLID_BREP': 5.0,
+}
+
+
+def estimate_cost(filename, scan=True):
+    """Cost record of one file: {'input', 'size', 'cost'} plus the entity counts used when scan."""
+    record = {'input': filename, 'size': os.path.getsize(filename)}
+    cost = COST_WEIGHTS['bytes'] * record['size']
+    if scan:
+        index = StepIndex(filename)
+        try:
+            counts = index.type_counts()
+        finally:
+            index.close()
+        for name, weight in COST_WEIGHTS.items():
+            if name != 'bytes':
+                record[name] = counts.get(name, 0)
+                cost = cost + weight * record[name]
+    record['cost'] = cost
+    return record
+
+
+def _estimate(args):
+    filename, scan = args
+    try:
+        return estimate_cost(filename, scan)
+    except (OSError, ValueError):
+        # Unreadable files are cheap for the scheduler; the parser reports the actual error
+        return {'input': filename, 'size': 0, 'cost': 0.0}
+
+
+def triage(filenames, scan=True, workers=None, timeout=0):
+    """Cost records of filenames, in the same order. Scanning runs on a process pool.
+
+    With a timeout (seconds), the scan is abandoned once no file has finished for that
+    long: its processes are killed and the files left get a size-only estimate, so one
+    pathological file cannot hold up the batch before it starts.
+    """
+    if not scan or (len(filenames) < 2 and not timeout):
+        return [_estimate((filename, scan)) for filename in filenames]
+    tasks = [(filename, scan) for filename in filenames]
+    records = {}
+    with multiprocessing.Pool(workers) as pool:
+        if not timeout:
+            return pool.map(_estimate, tasks, chunksize=64)
+        results = pool.imap_unordered(_estimate, tasks)
+        try:
+            for _ in tasks:
+                record = results.next(timeout)
+                records[record['input']] = record
+        except multiprocessing.TimeoutError:
+            pass
+    return [records.get(filename) or _estimate((filename, False)) for filename in filenames]
+
+
+def largest_first(records):
+    """Order files by decreasing cost, so no expensive file is started last (LPT scheduling)."""
+    return [r['input'] for r in sorted(records, key=lambda r: r['cost'], reverse=True)]
+
+
+def size_buckets(records, base=4.0):
+    """Group files into buckets of costs within a factor of base of each other,
+    most expensive bucket first. Files keep their input order inside a bucket."""
+    buckets = {}
+    for r in records:
+        key = int(math.floor(math.log(r['cost'], base))) if r['cost'] > 0 else None
+        buckets.setdefault(key, []).append(r['input'])
+    keys = sorted((k for k in buckets if k is not None), reverse=True)
+    if None in buckets:
+        keys.append(None)
+    return [buckets[k] for k in keys]
+
+
+def bucketed(records, base=4.0):
+    """Schedule order that drains the most expensive bucket first."""
+    return [filename for bucket in size_buckets(records, base) for filename in bucket]
+
+
+def stragglers(records, workers):
+    """Files whose cost alone exceeds an even share of the batch per worker.
+
+    Such a file bounds the makespan no matter how the rest is scheduled, so it is
+    worth knowing about (or splitting off) before the run starts.
+    """
+    total = sum(r['cost'] for r in records)
+    share = total / max(1, workers)
+    return sorted((r for r in records if r['cost'] > share), key=lambda r: r['cost'], reverse=True)
+
+
+# Schedule name -> order(records)
+SCHEDULES = {
+    'largest-first': largest_first,
+    'buckets': bucketed,
+}
+
+
+def schedule(filenames, order='largest-first', scan=True, workers=None, timeout=0):
+    """Return (ordered filenames, stragglers) for a batch run on workers processes."""
+    records = triage(filenames, scan=scan, workers=workers, timeout=timeout)
+    return SCHEDULES[order](records), stragglers(records, workers or os.cpu_count())
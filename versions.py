@@ -0,0 +1,40 @@
+"""Versions of the sections of a parsed solid, stamped into every output.
+
+Bump a section's version whenever the code producing it changes what it writes;
+outputs stamped with an older version are then stale for that section, and an
+update run (Solid.update_config, main_parallel_run.py --update) recomputes only the
+stale sections instead of parsing the file again.
+
+    bounding_box  the solid's (and oriented) bounding box and every face's
+    properties    volume, centroid and the face table
+    surfaces      every face's surface geometry
+    trims         every face's trim loops and the shared edge table
+    triangles     the mesh and its levels of detail
+    topology      the face / edge / vertex adjacency arrays
+"""
+
+SECTION_VERSIONS = {
+    'bounding_box': 1,
+    'properties': 2,
+    'surfaces': 3,
+    'trims': 2,
+    'triangles': 1,
+    'topology': 1,
+}
+
+
+def solid_configs(config):
+    """The solid configs of a parsed model (a compound or a single solid)."""
+    if config.get('shape') == 'Compound':
+        return list(config['data'])
+    return [config]
+
+
+def stale_sections(solid_config):
+    """Names of the sections of a solid config older than SECTION_VERSIONS (all for unstamped outputs)."""
+    versions = solid_config.get('versions', {})
+    return set(name for name, version in SECTION_VERSIONS.items() if versions.get(name) != version)
+
+
+def is_stale(config):
+    return any(stale_sections(solid) for solid in solid_configs(config))
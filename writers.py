@@ -0,0 +1,163 @@
+import json
+import types
+
+import numpy as np
+
+from columnar import write_columnar, read_columnar
+
+
+class NumpyJSONEncoder(json.JSONEncoder):
+    """Serialize the NumPy arrays and scalars kept in the parsed model as plain JSON lists/numbers."""
+
+    def default(self, obj):
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, np.generic):
+            return obj.item()
+        return super(NumpyJSONEncoder, self).default(obj)
+
+
+def _json_key(key):
+    # The conversion json.dump applies to non-string keys
+    if isinstance(key, str):
+        return key
+    if key is None or isinstance(key, (bool, int, float)):
+        return json.dumps(key)
+    raise TypeError("keys must be str, int, float, bool or None, not %s" % type(key).__name__)
+
+
+def _iterencode(value, encoder, indent, level):
+    """Encode value piece by piece, consuming generators (streamed 'data') as JSON arrays.
+
+    Produces the same text as json.dump with the same indent; everything that is not a
+    dict, list or generator is handed to the encoder in one go.
+    """
+    if isinstance(value, dict) and value:
+        pad = '\n' + ' ' * (indent * (level + 1))
+        yield '{'
+        first = True
+        for key, item in value.items():
+            yield (pad if first else ',' + pad) + json.dumps(_json_key(key)) + ': '
+            yield from _iterencode(item, encoder, indent, level + 1)
+            first = False
+        yield '\n' + ' ' * (indent * level) + '}'
+    elif isinstance(value, (list, types.GeneratorType)):
+        pad = '\n' + ' ' * (indent * (level + 1))
+        first = True
+        for item in value:
+            yield ('[' if first else ',') + pad
+            yield from _iterencode(item, encoder, indent, level + 1)
+            first = False
+        yield '[]' if first else '\n' + ' ' * (indent * level) + ']'
+    else:
+        yield encoder.encode(value).replace('\n', '\n' + ' ' * (indent * level))
+
+
+def write_json(config, filename, indent=4):
+    """Write config as indented JSON, streaming any generators in it (see Solid.parse_shape(stream=True))."""
+    encoder = NumpyJSONEncoder(indent=indent)
+    with open(filename, "w") as f:
+        for chunk in _iterencode(config, encoder, indent, 0):
+            f.write(chunk)
+
+
+def _header(config):
+    return {key: value for key, value in config.items() if key not in ('data', 'edges', 'face_table')}
+
+
+def iter_records(config):
+    """Flatten a parsed model into (record type, record) pairs: the compound, then every
+    solid followed by its faces, its shared edges and its face table. Streamed 'data' is
+    consumed lazily; the parts filled in while it is consumed come after it."""
+    if config.get('shape') == 'Compound':
+        yield 'compound', _header(config)
+        solids = config['data']
+    else:
+        solids = [config]
+    for solid in solids:
+        s_id = solid.get('solid id')
+        yield 'solid', _header(solid)
+        for face in solid['data']:
+            yield 'face', dict(face, **{'solid id': s_id})
+        for edge in solid.get('edges', []):
+            yield 'edge', dict(edge, **{'solid id': s_id})
+        if solid.get('face_table'):
+            yield 'face_table', dict(solid['face_table'], **{'solid id': s_id})
+
+
+def write_jsonl(config, filename):
+    """Write one JSON object per line for each record of iter_records, tagged with 'record'."""
+    encoder = NumpyJSONEncoder()
+    with open(filename, "w") as f:
+        for record_type, record in iter_records(config):
+            f.write(encoder.encode(dict({'record': record_type}, **record)))
+            f.write('\n')
+
+
+def read_jsonl(filename):
+    """Rebuild the model written by write_jsonl."""
+    config = None
+    solid = None
+    with open(filename) as f:
+        for line in f:
+            record = json.loads(line)
+            record_type = record.pop('record')
+            if record_type == 'compound':
+                config = dict(record, data=[])
+            elif record_type == 'solid':
+                solid = dict(record, data=[])
+                if config is None:
+                    config = solid
+                else:
+                    config['data'].append(solid)
+            else:
+                del record['solid id']
+                if record_type == 'face':
+                    solid['data'].append(record)
+                elif record_type == 'edge':
+                    solid.setdefault('edges', []).append(record)
+                elif record_type == 'face_table':
+                    solid['face_table'] = record
+    return config
+
+
+def read_json(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+
+def read_npz(filename):
+    return read_columnar(filename).to_config()
+
+
+# Output backends: format name -> (writer(config, filename), file extension)
+WRITERS = {
+    'json': (write_json, '.json'),
+    'jsonl': (write_jsonl, '.jsonl'),
+    'npz': (write_columnar, '.npz'),
+}
+
+
+def output_extension(output_format):
+    return WRITERS[output_format][1]
+
+
+# format name -> reader(filename) returning the model as nested dicts and lists
+READERS = {
+    'json': read_json,
+    'jsonl': read_jsonl,
+    'npz': read_npz,
+}
+
+
+def read_output(filename, output_format='json'):
+    """Read back an output written by write_output (arrays come back as lists)."""
+    if output_format not in READERS:
+        raise ValueError("Unknown output format %r, expected one of %s" % (output_format, sorted(READERS)))
+    return READERS[output_format](filename)
+
+
+def write_output(config, filename, output_format='json'):
+    if output_format not in WRITERS:
+        raise ValueError("Unknown output format %r, expected one of %s" % (output_format, sorted(WRITERS)))
+    WRITERS[output_format][0](config, filename)